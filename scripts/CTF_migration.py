@@ -1,47 +1,90 @@
 from pymongo import MongoClient, ReplaceOne
-from bson.objectid import ObjectId
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+import argparse
+import hashlib
 import os
 from dotenv import load_dotenv
+from bson_batches import byte_batches, raw_id
 
 # --- CONFIGURATION ---
 load_dotenv()
 SOURCE_URI = os.getenv("MONGODB_URI")
 TARGET_URI = os.getenv("TARGET_URI")
 DB_NAME = os.getenv("DB_NAME") # Name of the DB in both clusters
+IN_CHUNK = 10000 # Max ids per $in query
+DEFAULT_EVENTS = ["Cyber Quest"]
 
-def clone_cyber_quest():
+# Documents are read and written as undecoded BSON. Reading any field decodes the whole top
+# level of a document, so events are only touched through raw_id() and a projected read
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+def find_in(collection, field, values, projection=None):
+    """find({field: {$in: values}}) split into IN_CHUNK-sized queries."""
+    values = list(values)
+    docs = []
+    for i in range(0, len(values), IN_CHUNK):
+        docs.extend(collection.find({field: {"$in": values[i:i + IN_CHUNK]}}, projection))
+    return docs
+
+
+def content_hash(doc):
+    return hashlib.blake2b(doc.raw, digest_size=16).digest()
+
+
+def changed_docs(target_collection, docs):
+    """Docs that are missing on the target or whose raw BSON differs from the target copy."""
+    target_hashes = {
+        raw_id(d): content_hash(d)
+        for d in find_in(target_collection, "_id", [raw_id(doc) for doc in docs])
+    }
+    return [doc for doc in docs if target_hashes.get(raw_id(doc)) != content_hash(doc)]
+
+
+def migrate_events(event_names=(), categories=(), dry_run=False):
     source_client = MongoClient(SOURCE_URI)
     target_client = MongoClient(TARGET_URI)
 
-    s_db = source_client[DB_NAME]
-    t_db = target_client[DB_NAME]
+    s_db = source_client.get_database(DB_NAME, codec_options=RAW_CODEC_OPTIONS)
+    t_db = target_client.get_database(DB_NAME, codec_options=RAW_CODEC_OPTIONS)
 
     try:
-        # 1. Fetch the Event "Cyber Quest"
-        event = s_db.events.find_one({"eventName": "Cyber Quest"})
-        if not event:
-            print("Event 'Cyber Quest' not found!")
+        # 1. Fetch every selected event in one query
+        clauses = []
+        if event_names:
+            clauses.append({"eventName": {"$in": list(event_names)}})
+        if categories:
+            clauses.append({"category": {"$in": list(categories)}})
+        # Names come from a projected read: any field access on the full raw documents
+        # would decode their (large) registrations arrays, which are only copied
+        selected = list(s_db.events.find({"$or": clauses}, {"eventName": 1}))
+        if not selected:
+            print(f"No events found for names {list(event_names)} / categories {list(categories)}")
             return
 
-        event_id = event['_id']
-        print(f"Found Event ID: {event_id}. Starting migration...")
+        found = {e["eventName"] for e in selected}
+        for name in event_names:
+            if name not in found:
+                print(f"Event '{name}' not found!")
 
-        # 2. Get all Registrations for this event
-        registrations = list(s_db.registrations.find({"eventId": event_id}))
-        reg_ids = [r['_id'] for r in registrations]
+        event_ids = [e['_id'] for e in selected]
+        events = find_in(s_db.events, "_id", event_ids)
+        print(f"Found {len(events)} event(s): {', '.join(sorted(found))}. Starting migration...")
 
-        # 3. Get all Teams for this event
-        teams = list(s_db.teams.find({"eventId": event_id}))
+        # 2-3. All registrations and teams for these events
+        registrations = find_in(s_db.registrations, "eventId", event_ids)
+        teams = find_in(s_db.teams, "eventId", event_ids)
 
         # 4. Collect all User IDs involved
         # We need: participants, team leaders, team members, and check-in admins
         user_ids = set()
-        
+
         for r in registrations:
             user_ids.add(r.get('participant'))
             if r.get('checkedInBy'):
                 user_ids.add(r.get('checkedInBy'))
-        
+
         for t in teams:
             user_ids.add(t.get('teamLeader'))
             for member_id in t.get('team', []):
@@ -49,22 +92,31 @@ def clone_cyber_quest():
 
         # Remove None if any fields were empty
         user_ids.discard(None)
-        users = list(s_db.users.find({"_id": {"$in": list(user_ids)}}))
+        users = find_in(s_db.users, "_id", user_ids)
 
-        # --- DATA INSERTION (Upsert logic to preserve IDs) ---
+        # --- DATA INSERTION (only new/changed docs, upserts preserve IDs) ---
 
         def bulk_upsert(collection_name, data_list):
             if not data_list:
                 return
-            ops = [
-                ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) 
-                for doc in data_list
-            ]
-            result = t_db[collection_name].bulk_write(ops)
-            print(f"Collection '{collection_name}': Matched {result.matched_count}, Upserted {result.upserted_count}")
+            pending = changed_docs(t_db[collection_name], data_list)
+            unchanged = len(data_list) - len(pending)
+            if dry_run:
+                print(f"Collection '{collection_name}': {len(pending)} to write, {unchanged} unchanged [DRY RUN]")
+                return
+            matched = upserted = 0
+            for batch in byte_batches(pending):
+                ops = [
+                    ReplaceOne({"_id": raw_id(doc)}, doc, upsert=True)
+                    for doc in batch
+                ]
+                result = t_db[collection_name].bulk_write(ops, ordered=False)
+                matched += result.matched_count
+                upserted += result.upserted_count
+            print(f"Collection '{collection_name}': Updated {matched}, Upserted {upserted}, Unchanged {unchanged}")
 
         print("\nPushing data to Target DB...")
-        bulk_upsert("events", [event])
+        bulk_upsert("events", events)
         bulk_upsert("registrations", registrations)
         bulk_upsert("teams", teams)
         bulk_upsert("users", users)
@@ -78,4 +130,12 @@ def clone_cyber_quest():
         target_client.close()
 
 if __name__ == "__main__":
-    clone_cyber_quest()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Copy events with their registrations/teams/users to TARGET_URI")
+    parser.add_argument("--event", action="append", default=[], help="Event name (repeatable)")
+    parser.add_argument("--category", action="append", default=[], help="Event category, e.g. Software (repeatable)")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be written, do not write")
+    args = parser.parse_args()
+
+    if not args.event and not args.category:
+        args.event = DEFAULT_EVENTS
+    migrate_events(args.event, args.category, dry_run=args.dry_run)
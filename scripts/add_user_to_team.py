@@ -4,7 +4,7 @@ Surgically add an existing user to a team in an event.
 Creates a registration and adds the user to the team's member list.
 
 Usage:
-  python scripts/add_user_to_team.py --user <username|fullName|email> --team <teamCode> [--event "Cyber Quest"] [--dry-run]
+  python scripts/add_user_to_team.py --user <username|fullName|email|phone> --team <teamCode> [--event "Cyber Quest"] [--dry-run]
   python scripts/add_user_to_team.py --user kumar --team DAKSHH-XXXXX --event "Cyber Quest" --dry-run   # Preview only
   python scripts/add_user_to_team.py --user kumar --team DAKSHH-XXXXX --event "Cyber Quest"            # Execute
 
@@ -29,6 +29,8 @@ load_dotenv(root / ".env")
 from pymongo import MongoClient
 from bson import ObjectId
 
+from user_index import ACCEPT, EXACT, print_candidates, resolve_user
+
 EVENT_NAME = "Cyber Quest"
 
 
@@ -49,37 +51,27 @@ def get_db(client):
 
 
 def find_user(db, ident):
-    """Find user by username, fullName, or email. Prefer exact email when ident looks like email."""
-    users = db["users"]
-    ident = ident.strip()
-    # If it looks like an email, try exact email match FIRST (avoids wrong matches like "kumar" -> Nikunj Kumar)
-    if "@" in ident and "." in ident:
-        u = users.find_one({"email": ident})
-        if u:
-            return u
-        u = users.find_one({"email": re.compile(f"^{re.escape(ident)}$", re.I)})
-        if u:
-            return u
-    # Exact match for other fields
-    for field in ["username", "email", "fullName"]:
-        u = users.find_one({field: ident})
-        if u:
-            return u
-    # Case-insensitive partial (only if no @ - avoid "kumar" matching wrong email)
-    if "@" not in ident:
-        for field in ["username", "fullName"]:
-            u = users.find_one({field: re.compile(re.escape(ident), re.I)})
-            if u:
-                return u
-        u = users.find_one({"fullName": re.compile(re.escape(ident), re.I)})
-        if u:
-            return u
-    return None
+    """
+    Find user by username, fullName, email or phone through the local search index
+    (scripts/user_index.py). Exact matches win, then prefix, then fuzzy; an ident that
+    looks like an email only matches exactly (avoids wrong matches like "kumar" -> Nikunj Kumar).
+    Several users tied on the best score (e.g. "rahu" -> rahul, rahuls) means no match.
+    """
+    user, candidates = resolve_user(db, ident)
+    if user and candidates[0]["score"] < EXACT:
+        print(f"No exact match for '{ident}', using the best candidate of:")
+        print_candidates(candidates[:5], file=sys.stdout)
+    elif not user and candidates:
+        best = candidates[0]["score"]
+        tied = best >= ACCEPT and sum(c["score"] == best for c in candidates) > 1
+        print(f"Ambiguous '{ident}', candidates:" if tied else "Closest candidates:", file=sys.stderr)
+        print_candidates(candidates[:5])
+    return user
 
 
 def main():
     parser = argparse.ArgumentParser(description="Add user to team (prod - use with care)")
-    parser.add_argument("--user", help="Username, fullName, or email (partial match ok)")
+    parser.add_argument("--user", help="Username, fullName, email or phone (partial match ok)")
     parser.add_argument("--team", help="Team code (e.g. DAKSHH-XXXXX)")
     parser.add_argument("--event", default=EVENT_NAME, help=f"Event name (default: {EVENT_NAME})")
     parser.add_argument("--list-teams", action="store_true", help="List teams for the event and exit")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Local columnar (Parquet) snapshot of the collections the report scripts read, so repeated
+questions during the day are answered from disk instead of the production cluster.
+
+  users, events, registrations, teams, seminars, seminar_registrations
+  -> scripts/analytics_cache/<name>.parquet  (+ manifest.json with refresh times)
+
+A refresh skips collections refreshed within --ttl. Otherwise it fetches only documents
+created (_id time) or updated (updatedAt) since the previous refresh, merges them into the
+existing file and drops documents deleted at the source (_id-only read). ObjectIds are
+stored as hex strings; embedded documents as JSON strings.
+
+Incremental refreshes only see updates that move updatedAt. The app (mongoose timestamps)
+and the scripts here that write verified, paymentStatus or isActive set it; any other
+change made outside the app (mongosh, Compass, older one-off scripts) stays invisible to
+--from-snapshot reports until a refresh with --full.
+
+Reports read it with --from-snapshot (see load_snapshot()).
+
+Usage:
+  python scripts/analytics_cache.py              # Refresh stale collections
+  python scripts/analytics_cache.py --force      # Refresh everything now
+  python scripts/analytics_cache.py --full       # Re-export from scratch (no incremental merge)
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+
+from dotenv import load_dotenv
+
+load_dotenv(root / "client" / ".env.local")
+load_dotenv(root / ".env.local")
+load_dotenv(root / ".env")
+
+import numpy as np
+import pandas as pd
+from pymongo import MongoClient
+from bson import ObjectId
+
+CACHE_DIR = Path(__file__).resolve().parent / "analytics_cache"
+MANIFEST = CACHE_DIR / "manifest.json"
+DEFAULT_TTL = timedelta(hours=6)
+OVERLAP = timedelta(minutes=2)  # re-read window for writes in flight at the last refresh
+
+# cache name -> candidate source collection names (first existing one wins)
+COLLECTIONS = {
+    "users": ["users"],
+    "events": ["events"],
+    "registrations": ["registrations"],
+    "teams": ["teams"],
+    "seminars": ["Seminar", "seminars"],
+    "seminar_registrations": ["SeminarRegistration", "seminarregistrations"],
+}
+
+
+def get_db(client):
+    db_name = os.getenv("DB_NAME")
+    if db_name:
+        return client[db_name]
+    dbs = [d for d in client.list_database_names() if d not in ("admin", "config", "local")]
+    for name in dbs:
+        if "users" not in client[name].list_collection_names():
+            continue
+        if client[name]["users"].find_one({"fullName": {"$exists": True}}):
+            return client[name]
+    for name in dbs:
+        if "users" in client[name].list_collection_names():
+            return client[name]
+    return None
+
+
+def flatten_value(v):
+    if isinstance(v, ObjectId):
+        return str(v)
+    if isinstance(v, list):
+        return [flatten_value(x) for x in v]
+    if isinstance(v, dict):
+        return json.dumps(v, default=str)
+    return v
+
+
+def value_kind(v):
+    # Lists read back from Parquet are numpy arrays
+    return list if isinstance(v, (list, np.ndarray)) else type(v)
+
+
+def unify_columns(df):
+    """Parquet needs one type per column; fall back to strings where a field's type varies."""
+    for col in df.columns:
+        if df[col].dtype == object:
+            kinds = {value_kind(v) for v in df[col] if v is not None and not (isinstance(v, float) and np.isnan(v))}
+            if len(kinds) > 1:
+                df[col] = df[col].map(lambda v: v if v is None or (isinstance(v, float) and np.isnan(v)) else str(v))
+    return df
+
+
+def to_frame(docs):
+    return unify_columns(pd.DataFrame([{k: flatten_value(v) for k, v in doc.items()} for doc in docs]))
+
+
+def read_manifest():
+    if MANIFEST.is_file():
+        return json.loads(MANIFEST.read_text())
+    return {}
+
+
+def refresh_collection(coll, path, entry, full):
+    """Full or incremental export of one collection. Returns the new manifest entry."""
+    started = datetime.now(timezone.utc)
+    has_timestamps = coll.find_one({"updatedAt": {"$exists": True}}, {"_id": 1}) is not None
+
+    if full or not path.is_file() or not entry.get("watermark") or not has_timestamps:
+        df = to_frame(coll.find())
+        mode = "full"
+    else:
+        since = datetime.fromisoformat(entry["watermark"]) - OVERLAP
+        changed = to_frame(coll.find({"$or": [
+            {"_id": {"$gte": ObjectId.from_datetime(since)}},
+            {"updatedAt": {"$gte": since}},
+        ]}))
+        live_ids = {str(d["_id"]) for d in coll.find({}, {"_id": 1})}
+        existing = pd.read_parquet(path)
+        keep = existing["_id"].isin(live_ids)
+        if not changed.empty:
+            keep &= ~existing["_id"].isin(changed["_id"])
+        df = unify_columns(pd.concat([existing[keep], changed], ignore_index=True))
+        mode = f"incremental (+{len(changed)} changed, -{(~existing['_id'].isin(live_ids)).sum()} deleted)"
+
+    tmp = path.with_suffix(".tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    print(f"  {path.stem}: {len(df)} rows, {mode}")
+    return {"refreshed_at": started.isoformat(), "watermark": started.isoformat(), "rows": len(df)}
+
+
+def refresh(db, ttl=DEFAULT_TTL, force=False, full=False):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest()
+    existing = set(db.list_collection_names())
+    now = datetime.now(timezone.utc)
+
+    for name, candidates in COLLECTIONS.items():
+        source = next((c for c in candidates if c in existing), None)
+        if source is None:
+            print(f"  {name}: no source collection, skipped")
+            continue
+        entry = manifest.get(name, {})
+        refreshed_at = entry.get("refreshed_at")
+        if not (force or full) and refreshed_at and now - datetime.fromisoformat(refreshed_at) < ttl:
+            print(f"  {name}: fresh (refreshed {refreshed_at}), skipped")
+            continue
+        manifest[name] = refresh_collection(db[source], CACHE_DIR / f"{name}.parquet", entry, full)
+        MANIFEST.write_text(json.dumps(manifest, indent=2))
+
+
+def load_snapshot(name, ttl=DEFAULT_TTL):
+    """DataFrame for one cached collection. Never touches Mongo; warns when older than ttl."""
+    path = CACHE_DIR / f"{name}.parquet"
+    if not path.is_file():
+        raise SystemExit(f"No snapshot for {name!r}; run: python scripts/analytics_cache.py")
+    refreshed_at = read_manifest().get(name, {}).get("refreshed_at")
+    if refreshed_at and datetime.now(timezone.utc) - datetime.fromisoformat(refreshed_at) > ttl:
+        print(f"Warning: {name} snapshot is from {refreshed_at} (older than {ttl})", file=sys.stderr)
+    return pd.read_parquet(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the local analytics snapshot")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL.total_seconds() / 3600,
+                        help="Hours a collection stays fresh (default: 6)")
+    parser.add_argument("--force", action="store_true", help="Refresh even fresh collections")
+    parser.add_argument("--full", action="store_true", help="Full re-export instead of incremental merge")
+    args = parser.parse_args()
+
+    uri = os.getenv("MONGODB_URI")
+    if not uri:
+        print("MONGODB_URI not set in env", file=sys.stderr)
+        sys.exit(1)
+
+    client = MongoClient(uri)
+    db = get_db(client)
+    if db is None:
+        print("No suitable database found", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Refreshing snapshot in {CACHE_DIR}")
+    refresh(db, ttl=timedelta(hours=args.ttl), force=args.force, full=args.full)
+    client.close()
+    print("✅ Snapshot up to date.")
+
+
+if __name__ == "__main__":
+    main()
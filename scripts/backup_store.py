@@ -0,0 +1,129 @@
+"""
+Content-addressed backup store used by remove_user_with_backup.py.
+
+  backups/objects/<2 hex>/<hash>.bson.gz   one file per unique document (BSON, exact types)
+  backups/manifests/<backup_id>.json       which object hashes make up one backup
+  backups/index.sqlite3                    backup_id per user id and timestamp
+
+A document's hash is the BLAKE2b digest of its BSON encoding, so the same document
+backed up again (repeat runs, --dry-run, overlapping batches) is stored only once and
+a new backup costs just its manifest and index rows.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+import bson
+
+STORE_DIR = Path(__file__).resolve().parent / "backups"
+
+# Backup sections, in restore order
+SECTIONS = ("users", "registrations", "teams", "seminar_registrations")
+
+
+def doc_hash(encoded):
+    return hashlib.blake2b(encoded, digest_size=20).hexdigest()
+
+
+class BackupStore:
+    def __init__(self, root=STORE_DIR):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.manifests = self.root / "manifests"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.manifests.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.root / "index.sqlite3")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS backups (
+                backup_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                username TEXT,
+                full_name TEXT,
+                email TEXT,
+                backup_at TEXT NOT NULL,
+                dry_run INTEGER NOT NULL,
+                PRIMARY KEY (backup_id, user_id)
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS backups_user ON backups (user_id, backup_at)")
+
+    def object_path(self, h):
+        return self.objects / h[:2] / f"{h}.bson.gz"
+
+    def put(self, doc):
+        """Store one document (unless already present). Returns its hash."""
+        encoded = bson.encode(doc)
+        h = doc_hash(encoded)
+        path = self.object_path(h)
+        if not path.is_file():
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            with gzip.open(tmp, "wb") as f:
+                f.write(encoded)
+            os.replace(tmp, path)
+        return h
+
+    def get(self, h):
+        with gzip.open(self.object_path(h), "rb") as f:
+            return bson.decode(f.read())
+
+    def save(self, sections, users_meta, dry_run=False):
+        """
+        Store a backup: `sections` maps SECTIONS names to document lists, `users_meta`
+        is one {"user_id", "username", "fullName", "email"} dict per user. Returns the backup id.
+        """
+        backup_at = datetime.now(timezone.utc)
+        hashes = {name: [self.put(doc) for doc in sections.get(name, [])] for name in SECTIONS}
+        manifest = {
+            "backup_at": backup_at.isoformat(),
+            "dry_run": dry_run,
+            "users": users_meta,
+            "objects": hashes,
+        }
+        body = json.dumps(manifest, sort_keys=True)
+        backup_id = f"{backup_at.strftime('%Y%m%d_%H%M%S')}_{doc_hash(body.encode())[:8]}"
+        (self.manifests / f"{backup_id}.json").write_text(body)
+
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO backups VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (backup_id, m["user_id"], m.get("username"), m.get("fullName"), m.get("email"),
+                 manifest["backup_at"], int(dry_run))
+                for m in users_meta
+            ],
+        )
+        self.conn.commit()
+        return backup_id
+
+    def load(self, backup_id):
+        """Backup contents in the restore shape: SECTIONS lists plus "meta"."""
+        path = self.manifests / f"{backup_id}.json"
+        if not path.is_file():
+            return None
+        manifest = json.loads(path.read_text())
+        data = {name: [self.get(h) for h in manifest["objects"].get(name, [])] for name in SECTIONS}
+        data["meta"] = {"backup_at": manifest["backup_at"], "users": manifest["users"]}
+        return data
+
+    def find(self, user=None, include_dry_runs=True):
+        """Index rows (newest first), optionally for one user (_id, username or fullName)."""
+        query = "SELECT backup_id, user_id, username, full_name, backup_at, dry_run FROM backups"
+        clauses, params = [], []
+        if user is not None:
+            clauses.append("(user_id = ? OR username = ? OR full_name = ?)")
+            params += [str(user)] * 3
+        if not include_dry_runs:
+            clauses.append("dry_run = 0")
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        return self.conn.execute(query + " ORDER BY backup_at DESC", params).fetchall()
+
+    def close(self):
+        self.conn.close()
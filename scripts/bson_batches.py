@@ -0,0 +1,46 @@
+"""
+Byte-sized batching of raw BSON documents, shared by db_clone.py and CTF_migration.py.
+
+Documents read with RawBSONDocument keep their encoded bytes, so a batch can be cut by
+payload size rather than document count: bulk writes stay well under the server's
+message limit whether the documents are tiny or close to 16 MB.
+
+Reading any key of a RawBSONDocument decodes its whole top level (arrays become Python
+lists), so code that only needs the _id should use raw_id() instead of doc["_id"].
+"""
+
+from bson import ObjectId
+
+BATCH_BYTES = 8 * 1024 * 1024  # raw BSON bytes per insert/upsert batch
+MAX_BATCH_DOCS = 100000  # server maxWriteBatchSize
+
+
+def byte_batches(cursor, max_bytes=BATCH_BYTES):
+    """Group raw documents into batches of at most max_bytes (or MAX_BATCH_DOCS)."""
+    batch = []
+    batch_bytes = 0
+
+    for document in cursor:
+        size = len(document.raw)
+        if batch and (batch_bytes + size > max_bytes or len(batch) >= MAX_BATCH_DOCS):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(document)
+        batch_bytes += size
+
+    if batch:
+        yield batch
+
+
+def raw_id(document):
+    """
+    _id of a RawBSONDocument without decoding the rest of it. mongod stores _id as the
+    first field, so an ObjectId _id is read straight from the bytes; any other _id falls
+    back to a regular (full top-level) decode.
+    """
+    raw = document.raw
+    # int32 length | type 0x07 (ObjectId) | "_id\0" | 12 bytes
+    if raw[4] == 0x07 and raw[5:9] == b"_id\x00":
+        return ObjectId(raw[9:21])
+    return document["_id"]
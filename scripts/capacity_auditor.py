@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Watch event fill levels and close registration (isActive = false) once an event reaches teamLimit.
+
+Fill is computed from the source of truth, not from events.registrations (which drifts when
+orphaned IDs build up):
+  - Team events: number of teams
+  - Solo events: number of solo registrations (isInTeam = false)
+Each polling tick runs three aggregations however many events are open (open events with a
+teamLimit, then teams and solo registrations grouped by eventId), joined in memory. When
+nothing changes between ticks the polling interval doubles (up to --max-interval); any
+change resets it to --min-interval.
+
+Usage:
+  python scripts/capacity_auditor.py                  # Run until Ctrl+C
+  python scripts/capacity_auditor.py --once --dry-run # One tick, report only
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+
+from dotenv import load_dotenv
+
+load_dotenv(root / "client" / ".env.local")
+load_dotenv(root / ".env.local")
+load_dotenv(root / ".env")
+
+from pymongo import MongoClient
+
+
+def get_db(client):
+    db_name = os.getenv("DB_NAME")
+    if db_name:
+        return client[db_name]
+    dbs = [d for d in client.list_database_names() if d not in ("admin", "config", "local")]
+    for name in dbs:
+        if "users" not in client[name].list_collection_names():
+            continue
+        if client[name]["users"].find_one({"fullName": {"$exists": True}}):
+            return client[name]
+    for name in dbs:
+        if "users" in client[name].list_collection_names():
+            return client[name]
+    return None
+
+
+OPEN_EVENTS_PIPELINE = [
+    {"$match": {"isActive": {"$ne": False}, "teamLimit": {"$type": "number"}}},
+    {"$project": {
+        "eventName": 1,
+        "teamLimit": 1,
+        "isTeamEvent": 1,
+        "listed": {"$size": {"$ifNull": ["$registrations", []]}},
+    }},
+]
+
+
+def count_by_event(collection, match):
+    return {
+        g["_id"]: g["n"]
+        for g in collection.aggregate([
+            {"$match": match},
+            {"$group": {"_id": "$eventId", "n": {"$sum": 1}}},
+        ])
+    }
+
+
+def compute_fills(db):
+    """Open events with a limit and their real fill: one aggregation per collection, joined in memory."""
+    rows = list(db["events"].aggregate(OPEN_EVENTS_PIPELINE))
+    ids = [r["_id"] for r in rows]
+    teams = count_by_event(db["teams"], {"eventId": {"$in": ids}})
+    solo = count_by_event(db["registrations"], {"eventId": {"$in": ids}, "isInTeam": False})
+    for r in rows:
+        r["fill"] = (teams if r.get("isTeamEvent") is True else solo).get(r["_id"], 0)
+    return rows
+
+
+def audit_tick(db, dry_run):
+    """One polling tick. Returns {event_id: fill} for change detection."""
+    rows = compute_fills(db)
+    full = [r for r in rows if r["fill"] >= r["teamLimit"]]
+
+    for r in rows:
+        if r["listed"] != r["fill"]:
+            print(f"  [drift] {r['eventName']}: events.registrations has {r['listed']}, real fill {r['fill']}")
+
+    if full:
+        names = ", ".join(f"{r['eventName']} ({r['fill']}/{r['teamLimit']})" for r in full)
+        if dry_run:
+            print(f"  [DRY RUN] Would close: {names}")
+        else:
+            # updatedAt too, or snapshot-based reports keep showing the event as open
+            result = db["events"].update_many(
+                {"_id": {"$in": [r["_id"] for r in full]}, "isActive": {"$ne": False}},
+                {"$set": {"isActive": False}, "$currentDate": {"updatedAt": True}},
+            )
+            print(f"  Closed {result.modified_count} event(s): {names}")
+
+    return {r["_id"]: r["fill"] for r in rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auto-close events that reach teamLimit")
+    parser.add_argument("--min-interval", type=float, default=15, help="Seconds between busy ticks (default: 15)")
+    parser.add_argument("--max-interval", type=float, default=600, help="Back-off ceiling in seconds (default: 600)")
+    parser.add_argument("--once", action="store_true", help="Run a single tick and exit")
+    parser.add_argument("--dry-run", action="store_true", help="Report only, do not close events")
+    args = parser.parse_args()
+
+    uri = os.getenv("MONGODB_URI")
+    if not uri:
+        print("MONGODB_URI not set in env", file=sys.stderr)
+        sys.exit(1)
+
+    client = MongoClient(uri)
+    db = get_db(client)
+    if db is None:
+        print("No suitable database found", file=sys.stderr)
+        sys.exit(1)
+
+    interval = args.min_interval
+    previous = None
+
+    try:
+        while True:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Auditing capacity...")
+            fills = audit_tick(db, args.dry_run)
+            if args.once:
+                break
+
+            # Quiet period: back off exponentially; any fill change resets to the fast rate
+            if fills == previous:
+                interval = min(interval * 2, args.max_interval)
+            else:
+                interval = args.min_interval
+            previous = fills
+
+            print(f"  {len(fills)} open event(s) with a limit; next check in {interval:.0f}s")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
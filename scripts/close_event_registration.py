@@ -73,7 +73,10 @@ def main():
         print(f"[DRY RUN] Would set isActive=false for: {event['eventName']} (_id: {event['_id']})")
         return
 
-    result = events.update_one({"_id": event["_id"]}, {"$set": {"isActive": False}})
+    result = events.update_one(
+        {"_id": event["_id"], "isActive": {"$ne": False}},
+        {"$set": {"isActive": False}, "$currentDate": {"updatedAt": True}},
+    )
     if result.modified_count:
         print(f"Registration closed for: {event['eventName']}")
     else:
@@ -1,6 +1,47 @@
-from pymongo import MongoClient
+#!/usr/bin/env python3
+"""
+Clone every collection from MONGODB_URI into CLONE_URI.
+Collection options (validator, collation, ...) are recreated up front; indexes are
+built only after the bulk load, and the time spent in each phase is reported.
+
+Usage:
+  python scripts/db_clone.py                         # One collection at a time
+  python scripts/db_clone.py --workers 8             # Collections in parallel, large ones split by _id range
+  python scripts/db_clone.py --workers 8 --resume    # Continue an interrupted clone from its checkpoint
+  python scripts/db_clone.py --incremental           # Copy only what changed since the last --incremental run
+  python scripts/db_clone.py snapshot                # Write MONGODB_URI to a local archive in scripts/snapshots/
+  python scripts/db_clone.py restore --archive FILE --workers 8              # Restore an archive into CLONE_URI
+  python scripts/db_clone.py restore --archive FILE --collection users       # Restore one collection only
+  python scripts/db_clone.py restore --archive FILE --drop                   # Replace target collections that hold data
+
+Snapshot archive layout (.dsnap):
+  magic | chunk | chunk | ... | index (Extended JSON) | footer (index offset, magic)
+Each chunk is a zlib-compressed run of raw BSON documents from one collection. The index maps
+every collection to its options, index specs and chunk offsets, so restore can mmap the file
+and read just the chunks it needs, in parallel.
+"""
+
+import argparse
+import mmap
 import os
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from pymongo import IndexModel, MongoClient, ReplaceOne
+from pymongo.errors import BulkWriteError
+import bson
+from bson import ObjectId, json_util
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 from dotenv import load_dotenv
+
+from bson_batches import byte_batches, raw_id
+
 load_dotenv()
 
 SOURCE_URI = os.getenv("MONGODB_URI")
@@ -9,41 +50,521 @@ TARGET_URI = os.getenv("CLONE_URI")
 SOURCE_DB_NAME = os.getenv("DB_NAME")
 TARGET_DB_NAME = os.getenv("DB_NAME")
 
-BATCH_SIZE = 1000
+BATCH_SIZE = 1000  # _ids per delete_many when propagating deletes
+ID_CHUNK = 10000  # _ids per $in fetch of changed documents
+SPLIT_THRESHOLD = 50000  # collections with more docs than this get split into _id ranges
+CHECKPOINT_FILE = Path(__file__).resolve().parent / "clone_checkpoint.json"
+SYNC_STATE_FILE = Path(__file__).resolve().parent / "clone_sync_state.json"
+SYNC_OVERLAP = timedelta(minutes=2)  # re-read window covering writes still in flight at the last sync
 
+SNAPSHOT_DIR = Path(__file__).resolve().parent / "snapshots"
+SNAPSHOT_MAGIC = b"DKSNAP01"
+SNAPSHOT_FOOTER = struct.Struct("<Q8s")  # index offset, magic
+CHUNK_BYTES = 4 * 1024 * 1024  # uncompressed raw BSON per archive chunk
+COMPRESS_LEVEL = 6
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Documents stay as undecoded BSON bytes from the source cursor to the target write
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+class Checkpoint:
+    """Last committed _id for every (collection, _id range), flushed to disk after each batch."""
+
+    def __init__(self, path, state=None):
+        self.path = path
+        self.state = state or {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        return cls(path, read_state(path))
+
+    def ranges(self, collection_name):
+        return self.state.get(collection_name)
+
+    def set_ranges(self, collection_name, ranges):
+        with self.lock:
+            self.state[collection_name] = [
+                {"lo": lo, "hi": hi, "last": None, "done": False} for lo, hi in ranges
+            ]
+            self._flush()
+            return self.state[collection_name]
+
+    def commit(self, collection_name, index, last_id=None, done=False):
+        with self.lock:
+            entry = self.state[collection_name][index]
+            if last_id is not None:
+                entry["last"] = last_id
+            if done:
+                entry["done"] = True
+            self._flush()
+
+    def clear(self):
+        if self.path.is_file():
+            self.path.unlink()
+
+    def _flush(self):
+        write_state(self.path, self.state)
+
+
+def write_state(path, state):
+    # Write-then-rename so a crash mid-write never leaves a truncated state file
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        f.write(json_util.dumps(state, json_options=json_util.CANONICAL_JSON_OPTIONS))
+    os.replace(tmp, path)
+
+
+def read_state(path):
+    if not path.is_file():
+        return {}
+    with open(path) as f:
+        return json_util.loads(f.read())
 
-def clone_database():
-    source_client = MongoClient(SOURCE_URI)
-    target_client = MongoClient(TARGET_URI)
 
-    source_db = source_client[SOURCE_DB_NAME]
-    target_db = target_client[TARGET_DB_NAME]
+def split_ranges(collection, parts):
+    """Split a collection into `parts` contiguous [lo, hi) _id ranges (None = unbounded)."""
+    if parts <= 1:
+        return [(None, None)]
+    buckets = list(collection.aggregate(
+        [{"$bucketAuto": {"groupBy": "$_id", "buckets": parts}}],
+        allowDiskUse=True,
+    ))
+    bounds = [b["_id"]["min"] for b in buckets[1:]]
+    return list(zip([None] + bounds, bounds + [None]))
 
-    collections = source_db.list_collection_names()
 
-    for collection_name in collections:
-        print(f"Cloning collection: {collection_name}")
+def range_query(entry):
+    """Query for the not-yet-committed part of a range."""
+    bounds = {}
+    if entry["last"] is not None:
+        bounds["$gt"] = entry["last"]
+    elif entry["lo"] is not None:
+        bounds["$gte"] = entry["lo"]
+    if entry["hi"] is not None:
+        bounds["$lt"] = entry["hi"]
+    return {"_id": bounds} if bounds else {}
 
-        source_collection = source_db[collection_name]
-        target_collection = target_db[collection_name]
 
-        cursor = source_collection.find({})
-        batch = []
+def insert_batch(target_collection, batch, resuming=False):
+    """
+    insert_many; when `resuming`, documents already committed by the interrupted run
+    (duplicate _ids) are skipped. A fresh clone fails on them instead of silently keeping
+    whatever the target already held. Returns the number of documents inserted.
+    """
+    try:
+        # inserted_ids stays empty for RawBSONDocuments; without an error every document went in
+        target_collection.insert_many(batch, ordered=False, bypass_document_validation=True)
+        return len(batch)
+    except BulkWriteError as e:
+        if not resuming or any(err["code"] != DUPLICATE_KEY_ERROR for err in e.details["writeErrors"]):
+            raise
+        return e.details["nInserted"]
 
-        for document in cursor:
-            batch.append(document)
 
-            if len(batch) >= BATCH_SIZE:
-                target_collection.insert_many(batch, ordered=False)
-                batch = []
+def capture_metadata(db):
+    """Options (validator, collation, capped, view pipeline, ...) and index specs per collection."""
+    metadata = {}
+    for info in db.list_collections():
+        name = info["name"]
+        if name.startswith("system."):
+            continue
+        is_view = info.get("type") == "view"
+        metadata[name] = {
+            "view": is_view,
+            "options": dict(info.get("options", {})),
+            "indexes": [] if is_view else list(db[name].list_indexes()),
+        }
+    return metadata
 
-        if batch:
-            target_collection.insert_many(batch, ordered=False)
 
-        print(f"Finished cloning {collection_name}")
+def prepare_target(target_db, name, meta, existing):
+    """Create the target collection with the source options and no secondary indexes."""
+    if name not in existing:
+        target_db.create_collection(name, **meta["options"])
+        return
+    if meta["view"]:
+        return
+    # Pre-existing secondary indexes would slow every insert; they are rebuilt after the load
+    target_collection = target_db[name]
+    for spec in list(target_collection.list_indexes()):
+        if spec["name"] != "_id_":
+            target_collection.drop_index(spec["name"])
+            print(f"  Dropped target index {name}.{spec['name']} until load completes")
 
+
+def build_indexes(target_collection, specs):
+    """Recreate the source's secondary indexes from their list_indexes() specs."""
+    models = []
+    for spec in specs:
+        if spec["name"] == "_id_":
+            continue
+        options = {k: v for k, v in spec.items() if k not in ("key", "v", "ns")}
+        models.append(IndexModel(list(spec["key"].items()), **options))
+    if models:
+        target_collection.create_indexes(models)
+    return target_collection.name, len(models)
+
+
+def copy_range(source_collection, target_collection, checkpoint, index, entry, resuming=False):
+    """Copy one _id range in _id order, checkpointing after every committed batch."""
+    name = source_collection.name
+    cursor = source_collection.find(range_query(entry), sort=[("_id", 1)])
+    copied = 0
+
+    for batch in byte_batches(cursor):
+        insert_batch(target_collection, batch, resuming)
+        checkpoint.commit(name, index, raw_id(batch[-1]))
+        copied += len(batch)
+
+    checkpoint.commit(name, index, done=True)
+    return name, index, copied
+
+
+def clone_database(workers=1, resume=False):
+    source_client = MongoClient(SOURCE_URI, maxPoolSize=max(workers, 10))
+    target_client = MongoClient(TARGET_URI, maxPoolSize=max(workers, 10))
+
+    source_db = source_client.get_database(SOURCE_DB_NAME, codec_options=RAW_CODEC_OPTIONS)
+    target_db = target_client.get_database(TARGET_DB_NAME, codec_options=RAW_CODEC_OPTIONS)
+
+    checkpoint = Checkpoint.load(CHECKPOINT_FILE) if resume else Checkpoint(CHECKPOINT_FILE)
+    if resume and checkpoint.state:
+        print(f"Resuming from checkpoint: {CHECKPOINT_FILE}")
+
+    timings = {}
+
+    try:
+        # Phase 1: recreate collections with their options, but without secondary indexes
+        started = time.perf_counter()
+        metadata = capture_metadata(source_client[SOURCE_DB_NAME])
+        existing = set(target_db.list_collection_names())
+        for collection_name, meta in metadata.items():
+            # On resume the previous run already prepared (and possibly loaded) the target
+            if not (resume and checkpoint.ranges(collection_name) is not None):
+                prepare_target(target_db, collection_name, meta, existing)
+        collections = [name for name, meta in metadata.items() if not meta["view"]]
+        timings["prepare"] = time.perf_counter() - started
+
+        # Phase 2: bulk load
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = []
+
+            for collection_name in collections:
+                source_collection = source_db[collection_name]
+                target_collection = target_db[collection_name]
+
+                ranges = checkpoint.ranges(collection_name)
+                if ranges is None:
+                    count = source_collection.estimated_document_count()
+                    parts = min(workers, -(-count // SPLIT_THRESHOLD)) if workers > 1 else 1
+                    ranges = checkpoint.set_ranges(collection_name, split_ranges(source_collection, parts))
+
+                pending = [(i, entry) for i, entry in enumerate(ranges) if not entry["done"]]
+                if not pending:
+                    print(f"Skipping {collection_name} (already cloned)")
+                    continue
+
+                print(f"Cloning collection: {collection_name} ({len(ranges)} range(s), {len(pending)} pending)")
+                for index, entry in pending:
+                    futures.append(pool.submit(
+                        copy_range, source_collection, target_collection, checkpoint, index, entry, resume
+                    ))
+
+            for future in as_completed(futures):
+                name, index, copied = future.result()
+                total = len(checkpoint.ranges(name))
+                print(f"Finished cloning {name} [range {index + 1}/{total}]: {copied} docs")
+        timings["load"] = time.perf_counter() - started
+
+        # Phase 3: build every index once the data is in place
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(build_indexes, target_db[name], metadata[name]["indexes"])
+                for name in collections
+            ]
+            for future in as_completed(futures):
+                name, built = future.result()
+                if built:
+                    print(f"Built {built} index(es) on {name}")
+        timings["index"] = time.perf_counter() - started
+    finally:
+        source_client.close()
+        target_client.close()
+
+    checkpoint.clear()
+    print("Phase timings: " + ", ".join(f"{phase} {secs:.1f}s" for phase, secs in timings.items()))
     print("✅ Database cloning completed.")
 
 
+def delta_query(mark, has_timestamps):
+    """Documents created (by ObjectId time) or updated (by updatedAt) since the high-water mark."""
+    clauses = []
+    if mark.get("id_time") is not None:
+        clauses.append({"_id": {"$gte": ObjectId.from_datetime(mark["id_time"] - SYNC_OVERLAP)}})
+    if has_timestamps and mark.get("updated_at") is not None:
+        clauses.append({"updatedAt": {"$gte": mark["updated_at"] - SYNC_OVERLAP}})
+    # No usable mark (first run, or non-ObjectId _ids without updatedAt): copy everything
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def upsert_batch(target_collection, batch):
+    result = target_collection.bulk_write(
+        [ReplaceOne({"_id": raw_id(doc)}, doc, upsert=True) for doc in batch],
+        ordered=False,
+        bypass_document_validation=True,
+    )
+    return result.upserted_count, result.modified_count
+
+
+def propagate_deletes(source_collection, target_collection):
+    """Delete target documents whose _id no longer exists in the source (_id-only, index-covered reads)."""
+    source_ids = {doc["_id"] for doc in source_collection.find({}, {"_id": 1}, batch_size=10000)}
+    stale = []
+    deleted = 0
+
+    for doc in target_collection.find({}, {"_id": 1}, batch_size=10000):
+        if doc["_id"] not in source_ids:
+            stale.append(doc["_id"])
+            if len(stale) >= BATCH_SIZE:
+                deleted += target_collection.delete_many({"_id": {"$in": stale}}).deleted_count
+                stale = []
+
+    if stale:
+        deleted += target_collection.delete_many({"_id": {"$in": stale}}).deleted_count
+    return deleted
+
+
+def sync_collection(source_collection, target_collection, mark):
+    """Upsert new/changed documents since `mark`, then propagate deletes. Returns (counts, new mark)."""
+    has_timestamps = source_collection.find_one({"updatedAt": {"$exists": True}}, {"_id": 1}) is not None
+    projection = {"_id": 1, "updatedAt": 1} if has_timestamps else {"_id": 1}
+
+    # The marks come from a projected pass over the delta: reading fields of the full raw
+    # documents would decode their whole top level, arrays included
+    new_mark = dict(mark)
+    changed_ids = []
+    for document in source_collection.find(delta_query(mark, has_timestamps), projection, batch_size=10000):
+        if isinstance(document["_id"], ObjectId):
+            # Naive UTC, to compare with updatedAt and with marks read back from the state file
+            id_time = document["_id"].generation_time.replace(tzinfo=None)
+            if new_mark.get("id_time") is None or id_time > new_mark["id_time"]:
+                new_mark["id_time"] = id_time
+        updated_at = document.get("updatedAt") if has_timestamps else None
+        if updated_at is not None:
+            if new_mark.get("updated_at") is None or updated_at > new_mark["updated_at"]:
+                new_mark["updated_at"] = updated_at
+        changed_ids.append(document["_id"])
+
+    # Full documents are then fetched by _id and written back without being decoded
+    upserted = modified = 0
+    for i in range(0, len(changed_ids), ID_CHUNK):
+        cursor = source_collection.find({"_id": {"$in": changed_ids[i:i + ID_CHUNK]}})
+        for batch in byte_batches(cursor):
+            u, m = upsert_batch(target_collection, batch)
+            upserted, modified = upserted + u, modified + m
+
+    deleted = propagate_deletes(source_collection, target_collection)
+    return {"upserted": upserted, "modified": modified, "deleted": deleted}, new_mark
+
+
+def sync_database(workers=1):
+    """Incremental sync: copy only documents created/changed since the last run and propagate deletes."""
+    source_client = MongoClient(SOURCE_URI, maxPoolSize=max(workers, 10))
+    target_client = MongoClient(TARGET_URI, maxPoolSize=max(workers, 10))
+
+    source_db = source_client.get_database(SOURCE_DB_NAME, codec_options=RAW_CODEC_OPTIONS)
+    target_db = target_client.get_database(TARGET_DB_NAME, codec_options=RAW_CODEC_OPTIONS)
+
+    state = read_state(SYNC_STATE_FILE)
+    lock = threading.Lock()
+
+    def run(collection_name):
+        counts, new_mark = sync_collection(
+            source_db[collection_name], target_db[collection_name], state.get(collection_name, {})
+        )
+        # Only advance the mark once the whole collection has synced
+        with lock:
+            state[collection_name] = new_mark
+            write_state(SYNC_STATE_FILE, state)
+        return collection_name, counts
+
+    try:
+        # Views have no documents of their own and system.* is server-managed, as in clone_database
+        metadata = capture_metadata(source_client[SOURCE_DB_NAME])
+        collections = [name for name, meta in metadata.items() if not meta["view"]]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run, name) for name in collections]
+            for future in as_completed(futures):
+                name, counts = future.result()
+                print(f"Synced {name}: {counts['upserted']} new, {counts['modified']} changed, "
+                      f"{counts['deleted']} deleted")
+    finally:
+        source_client.close()
+        target_client.close()
+
+    print("✅ Incremental sync completed.")
+
+
+def snapshot_database(archive_path):
+    """Stream every source collection into a compressed, chunked archive with a trailing index."""
+    source_client = MongoClient(SOURCE_URI)
+    source_db = source_client.get_database(SOURCE_DB_NAME, codec_options=RAW_CODEC_OPTIONS)
+
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = archive_path.with_suffix(".tmp")
+    started = time.perf_counter()
+
+    try:
+        metadata = capture_metadata(source_client[SOURCE_DB_NAME])
+        index = {
+            "db": SOURCE_DB_NAME,
+            "created_at": datetime.now(timezone.utc),
+            "collections": {},
+        }
+
+        with open(tmp_path, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+
+            for name, meta in metadata.items():
+                chunks = []
+                if not meta["view"]:
+                    for batch in byte_batches(source_db[name].find(), max_bytes=CHUNK_BYTES):
+                        raw = b"".join(doc.raw for doc in batch)
+                        data = zlib.compress(raw, COMPRESS_LEVEL)
+                        chunks.append({"offset": f.tell(), "length": len(data), "raw_length": len(raw),
+                                       "docs": len(batch)})
+                        f.write(data)
+
+                index["collections"][name] = {"meta": meta, "chunks": chunks}
+                docs = sum(c["docs"] for c in chunks)
+                print(f"Snapshot {name}: {docs} docs in {len(chunks)} chunk(s)")
+
+            index_offset = f.tell()
+            f.write(json_util.dumps(index, json_options=json_util.CANONICAL_JSON_OPTIONS).encode())
+            f.write(SNAPSHOT_FOOTER.pack(index_offset, SNAPSHOT_MAGIC))
+
+        os.replace(tmp_path, archive_path)
+    finally:
+        source_client.close()
+
+    size_mb = archive_path.stat().st_size / (1024 * 1024)
+    print(f"✅ Snapshot written: {archive_path} ({size_mb:.1f} MB, {time.perf_counter() - started:.1f}s)")
+
+
+def read_snapshot_index(mm):
+    """Parse the trailing index of a memory-mapped archive."""
+    if mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise ValueError("Not a snapshot archive (bad header)")
+    index_offset, magic = SNAPSHOT_FOOTER.unpack(mm[-SNAPSHOT_FOOTER.size:])
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Truncated snapshot archive (bad footer)")
+    return json_util.loads(mm[index_offset:len(mm) - SNAPSHOT_FOOTER.size].decode())
+
+
+def restore_snapshot(archive_path, only=None, workers=1, drop=False):
+    """
+    Restore an archive (or just the `only` collection) into CLONE_URI with parallel chunk reads.
+    Each restored collection ends up exactly as snapshotted: a non-empty target collection
+    is refused unless `drop`, which drops it first.
+    """
+    target_client = MongoClient(TARGET_URI, maxPoolSize=max(workers, 10))
+    target_db = target_client.get_database(TARGET_DB_NAME, codec_options=RAW_CODEC_OPTIONS)
+    timings = {}
+
+    with open(archive_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        index = read_snapshot_index(mm)
+        collections = index["collections"]
+        if only:
+            if only not in collections:
+                raise SystemExit(f"Collection {only!r} not in snapshot {archive_path}")
+            collections = {only: collections[only]}
+        print(f"Restoring snapshot of {index['db']} taken at {index['created_at']}")
+
+        def restore_chunk(name, chunk):
+            start = chunk["offset"]
+            raw = zlib.decompress(mm[start:start + chunk["length"]])
+            return name, insert_batch(target_db[name], bson.decode_all(raw, RAW_CODEC_OPTIONS))
+
+        try:
+            started = time.perf_counter()
+            existing = set(target_db.list_collection_names())
+            occupied = [
+                name for name, entry in collections.items()
+                if name in existing and not entry["meta"]["view"] and target_db[name].find_one({}, {"_id": 1})
+            ]
+            if occupied and not drop:
+                raise SystemExit(
+                    f"Target collection(s) not empty: {', '.join(occupied)}. "
+                    "Restoring into them would mix live and snapshot documents; rerun with --drop to replace them."
+                )
+            for name in collections:
+                if drop and name in existing:
+                    target_db.drop_collection(name)
+                    existing.discard(name)
+                    print(f"  Dropped target collection {name}")
+            for name, entry in collections.items():
+                prepare_target(target_db, name, entry["meta"], existing)
+            timings["prepare"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            restored = {}
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(restore_chunk, name, chunk)
+                    for name, entry in collections.items()
+                    for chunk in entry["chunks"]
+                ]
+                for future in as_completed(futures):
+                    name, docs = future.result()
+                    restored[name] = restored.get(name, 0) + docs
+            for name, docs in restored.items():
+                print(f"Restored {name}: {docs} docs")
+            timings["load"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for name, entry in collections.items():
+                if not entry["meta"]["view"]:
+                    build_indexes(target_db[name], entry["meta"]["indexes"])
+            timings["index"] = time.perf_counter() - started
+        finally:
+            target_client.close()
+
+    print("Phase timings: " + ", ".join(f"{phase} {secs:.1f}s" for phase, secs in timings.items()))
+    print("✅ Restore completed.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clone the source database into CLONE_URI")
+    parser.add_argument("mode", nargs="?", choices=["clone", "snapshot", "restore"], default="clone",
+                        help="clone (default), snapshot to a local archive, or restore an archive")
+    parser.add_argument("--archive", type=Path, help="Snapshot archive path (snapshot/restore)")
+    parser.add_argument("--collection", help="Restore only this collection from the archive")
+    parser.add_argument("--drop", action="store_true", help="Restore: drop target collections that already hold data")
+    parser.add_argument("--workers", type=int, default=1, help="Parallel copy workers (default: 1)")
+    parser.add_argument("--resume", action="store_true", help=f"Resume from {CHECKPOINT_FILE.name}")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"Delta sync since the last run (high-water marks in {SYNC_STATE_FILE.name})")
+    args = parser.parse_args()
+
+    if args.mode == "snapshot":
+        ts = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        snapshot_database(args.archive or SNAPSHOT_DIR / f"{SOURCE_DB_NAME}_{ts}.dsnap")
+    elif args.mode == "restore":
+        if not args.archive:
+            parser.error("restore requires --archive")
+        restore_snapshot(args.archive, only=args.collection, workers=max(1, args.workers), drop=args.drop)
+    elif args.incremental:
+        sync_database(workers=max(1, args.workers))
+    else:
+        clone_database(workers=max(1, args.workers), resume=args.resume)
+
+
 if __name__ == "__main__":
-    clone_database()
\ No newline at end of file
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Maintain the materialized `event_stats` collection (one document per event, _id = event _id):
+  registrations, verified, checkedIn, foodServed (servings), participantsFed,
+  teams, paidTeams, fill (teams for team events, solo registrations for solo events)
+
+--backfill recomputes every event. Without it, only events touched since the stored
+watermark are recomputed: events whose registrations/teams were created (_id time) or
+updated (updatedAt) after it, plus events whose own updatedAt moved (registrations pulled
+through the app). Deletes made outside the app are picked up by the next --backfill.
+Scripts that write registrations/teams/events bump updatedAt ($currentDate) for the same
+reason; a write that does not is only seen by --backfill.
+
+Cost: registrations and teams have no updatedAt index, so the $or in touched_event_ids()
+makes every incremental run a full scan of both collections (only the touched events are
+then recomputed and written). With an {updatedAt: 1} index on each, both halves of the $or
+become index scans.
+
+Usage:
+  python scripts/event_stats.py --backfill   # Full rebuild (first run / nightly)
+  python scripts/event_stats.py              # Incremental refresh (cron every few minutes)
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+
+from dotenv import load_dotenv
+
+load_dotenv(root / "client" / ".env.local")
+load_dotenv(root / ".env.local")
+load_dotenv(root / ".env")
+
+from pymongo import MongoClient, ReplaceOne
+from bson import ObjectId
+
+STATS_COLLECTION = "event_stats"
+META_COLLECTION = "event_stats_meta"
+OVERLAP = timedelta(minutes=2)  # re-read window for writes in flight at the last run
+
+
+def get_db(client):
+    db_name = os.getenv("DB_NAME")
+    if db_name:
+        return client[db_name]
+    dbs = [d for d in client.list_database_names() if d not in ("admin", "config", "local")]
+    for name in dbs:
+        if "users" not in client[name].list_collection_names():
+            continue
+        if client[name]["users"].find_one({"fullName": {"$exists": True}}):
+            return client[name]
+    for name in dbs:
+        if "users" in client[name].list_collection_names():
+            return client[name]
+    return None
+
+
+def touched_event_ids(db, since):
+    """Event ids with registrations/teams/event docs created or updated since `since`."""
+    changed = {"$or": [
+        {"_id": {"$gte": ObjectId.from_datetime(since)}},
+        {"updatedAt": {"$gte": since}},
+    ]}
+    ids = set()
+    for coll in ("registrations", "teams"):
+        ids.update(g["_id"] for g in db[coll].aggregate([
+            {"$match": changed},
+            {"$group": {"_id": "$eventId"}},
+        ]))
+    ids.update(e["_id"] for e in db["events"].find({"updatedAt": {"$gte": since}}, {"_id": 1}))
+    ids.discard(None)
+    return ids
+
+
+def compute_stats(db, event_ids=None):
+    """Stats docs for `event_ids` (all events when None): one aggregation per collection."""
+    match = {} if event_ids is None else {"eventId": {"$in": list(event_ids)}}
+    event_match = {} if event_ids is None else {"_id": {"$in": list(event_ids)}}
+
+    regs = {
+        g["_id"]: g
+        for g in db["registrations"].aggregate([
+            {"$match": match},
+            {"$group": {
+                "_id": "$eventId",
+                "registrations": {"$sum": 1},
+                "solo": {"$sum": {"$cond": [{"$eq": ["$isInTeam", True]}, 0, 1]}},
+                "verified": {"$sum": {"$cond": [{"$eq": ["$verified", True]}, 1, 0]}},
+                "checkedIn": {"$sum": {"$cond": [{"$eq": ["$checkedIn", True]}, 1, 0]}},
+                "foodServed": {"$sum": {"$ifNull": ["$foodServedCount", 0]}},
+                "participantsFed": {"$sum": {"$cond": [{"$gt": ["$foodServedCount", 0]}, 1, 0]}},
+            }},
+        ])
+    }
+    teams = {
+        g["_id"]: g
+        for g in db["teams"].aggregate([
+            {"$match": match},
+            {"$group": {
+                "_id": "$eventId",
+                "teams": {"$sum": 1},
+                "paidTeams": {"$sum": {"$cond": [{"$eq": ["$paymentStatus", "completed"]}, 1, 0]}},
+            }},
+        ])
+    }
+
+    now = datetime.now(timezone.utc)
+    stats = []
+    for ev in db["events"].find(event_match, {"eventName": 1, "isTeamEvent": 1, "teamLimit": 1}):
+        r = regs.get(ev["_id"], {})
+        t = teams.get(ev["_id"], {})
+        is_team = ev.get("isTeamEvent", False)
+        stats.append({
+            "_id": ev["_id"],
+            "eventName": ev.get("eventName"),
+            "isTeamEvent": is_team,
+            "teamLimit": ev.get("teamLimit"),
+            "registrations": r.get("registrations", 0),
+            "verified": r.get("verified", 0),
+            "checkedIn": r.get("checkedIn", 0),
+            "foodServed": r.get("foodServed", 0),
+            "participantsFed": r.get("participantsFed", 0),
+            "teams": t.get("teams", 0),
+            "paidTeams": t.get("paidTeams", 0),
+            "fill": t.get("teams", 0) if is_team else r.get("solo", 0),
+            "updatedAt": now,
+        })
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the event_stats collection")
+    parser.add_argument("--backfill", action="store_true", help="Recompute every event")
+    args = parser.parse_args()
+
+    uri = os.getenv("MONGODB_URI")
+    if not uri:
+        print("MONGODB_URI not set in env", file=sys.stderr)
+        sys.exit(1)
+
+    client = MongoClient(uri)
+    db = get_db(client)
+    if db is None:
+        print("No suitable database found", file=sys.stderr)
+        sys.exit(1)
+
+    meta = db[META_COLLECTION]
+    started = datetime.now(timezone.utc)
+    watermark = meta.find_one({"_id": "watermark"})
+
+    if args.backfill or not watermark:
+        print("Backfilling event_stats for all events...")
+        stats = compute_stats(db)
+        # Events deleted since the last backfill
+        stale = db[STATS_COLLECTION].delete_many({"_id": {"$nin": [s["_id"] for s in stats]}}).deleted_count
+        if stale:
+            print(f"  Removed {stale} stale event(s)")
+    else:
+        since = watermark["at"].replace(tzinfo=timezone.utc) - OVERLAP
+        event_ids = touched_event_ids(db, since)
+        print(f"Refreshing {len(event_ids)} event(s) touched since {since.isoformat()}")
+        stats = compute_stats(db, event_ids) if event_ids else []
+
+    if stats:
+        db[STATS_COLLECTION].bulk_write(
+            [ReplaceOne({"_id": s["_id"]}, s, upsert=True) for s in stats], ordered=False
+        )
+
+    # Advance the watermark only after the stats are written
+    meta.replace_one({"_id": "watermark"}, {"_id": "watermark", "at": started}, upsert=True)
+    print(f"Updated {len(stats)} event_stats document(s)")
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
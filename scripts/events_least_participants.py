@@ -2,12 +2,19 @@
 """
 Find events with the least number of participants.
 For team events: shows both number of teams and number of participants.
+Also shows verified / checked-in participants and paid teams.
 
-Usage: python scripts/events_least_participants.py [--top N]
+Counts come from one $group aggregation on registrations and one on teams
+(no per-event queries); the top N are picked with a heap.
+
+Usage: python scripts/events_least_participants.py [--top N] [--from-stats | --from-snapshot]
+       --from-stats reads the precomputed event_stats collection (scripts/event_stats.py)
+       --from-snapshot reads the local Parquet snapshot (scripts/analytics_cache.py), no Mongo access
 Default: top 10 events with least participants
 """
 
 import argparse
+import heapq
 import os
 import sys
 from pathlib import Path
@@ -40,11 +47,75 @@ def get_db(client):
     return None
 
 
+def count_live(registrations, teams):
+    """Per-event counts: one aggregation per collection, joined in memory by the caller."""
+    reg_counts = {
+        g["_id"]: g
+        for g in registrations.aggregate([
+            {"$group": {
+                "_id": "$eventId",
+                "participants": {"$sum": 1},
+                "verified": {"$sum": {"$cond": [{"$eq": ["$verified", True]}, 1, 0]}},
+                "checkedIn": {"$sum": {"$cond": [{"$eq": ["$checkedIn", True]}, 1, 0]}},
+            }}
+        ])
+    }
+    team_counts = {
+        g["_id"]: g
+        for g in teams.aggregate([
+            {"$group": {
+                "_id": "$eventId",
+                "teams": {"$sum": 1},
+                "paidTeams": {"$sum": {"$cond": [{"$eq": ["$paymentStatus", "completed"]}, 1, 0]}},
+            }}
+        ])
+    }
+    return reg_counts, team_counts
+
+
+def count_snapshot():
+    """Same counts as count_live(), from the local snapshot (ids are hex strings)."""
+    from analytics_cache import load_snapshot
+
+    regs = load_snapshot("registrations")
+    reg_counts = {}
+    if "eventId" in regs:
+        for col in ("verified", "checkedIn"):
+            regs[col] = regs[col].eq(True) if col in regs else False
+        grouped = regs.groupby("eventId").agg(
+            participants=("_id", "size"), verified=("verified", "sum"), checkedIn=("checkedIn", "sum")
+        )
+        reg_counts = {eid: {k: int(v) for k, v in g.items()} for eid, g in grouped.iterrows()}
+
+    teams = load_snapshot("teams")
+    team_counts = {}
+    if "eventId" in teams:
+        teams["paid"] = teams["paymentStatus"].eq("completed") if "paymentStatus" in teams else False
+        grouped = teams.groupby("eventId").agg(teams=("_id", "size"), paidTeams=("paid", "sum"))
+        team_counts = {eid: {k: int(v) for k, v in g.items()} for eid, g in grouped.iterrows()}
+
+    events = load_snapshot("events")
+    for col in ("isTeamEvent", "category"):
+        if col not in events:
+            events[col] = None
+    events = events[["_id", "eventName", "isTeamEvent", "category"]].astype(object)
+    events = events.where(events.notna(), None).to_dict("records")
+    return events, reg_counts, team_counts
+
+
 def main():
     parser = argparse.ArgumentParser(description="Events with least participants")
     parser.add_argument("--top", type=int, default=10, help="Number of events to show (default: 10)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--from-stats", action="store_true", help="Read counts from event_stats instead of recounting")
+    source.add_argument("--from-snapshot", action="store_true", help="Answer from the local snapshot without touching Mongo")
     args = parser.parse_args()
 
+    if args.from_snapshot:
+        event_docs, reg_counts, team_counts = count_snapshot()
+        print_least(event_docs, reg_counts, team_counts, args.top)
+        return
+
     uri = os.getenv("MONGODB_URI")
     if not uri:
         print("MONGODB_URI not set in env", file=sys.stderr)
@@ -60,42 +131,58 @@ def main():
     registrations = db["registrations"]
     teams = db["teams"]
 
-    # Get all events with participant count
-    event_list = list(events.find({}, {"_id": 1, "eventName": 1, "isTeamEvent": 1, "category": 1}))
+    if args.from_stats:
+        # Precomputed by scripts/event_stats.py
+        stats = list(db["event_stats"].find())
+        reg_counts = {
+            s["_id"]: {"participants": s["registrations"], "verified": s["verified"], "checkedIn": s["checkedIn"]}
+            for s in stats
+        }
+        team_counts = {s["_id"]: {"teams": s["teams"], "paidTeams": s["paidTeams"]} for s in stats}
+    else:
+        reg_counts, team_counts = count_live(registrations, teams)
+
+    event_docs = events.find({}, {"_id": 1, "eventName": 1, "isTeamEvent": 1, "category": 1})
+    print_least(event_docs, reg_counts, team_counts, args.top)
+    client.close()
 
+
+def print_least(event_docs, reg_counts, team_counts, top_n):
     results = []
-    for ev in event_list:
-        eid = ev["_id"]
-        participant_count = registrations.count_documents({"eventId": eid})
+    for ev in event_docs:
+        regs = reg_counts.get(ev["_id"], {})
         is_team = ev.get("isTeamEvent", False)
 
         row = {
             "eventName": ev["eventName"],
             "category": ev.get("category", ""),
             "isTeamEvent": is_team,
-            "participants": participant_count,
+            "participants": regs.get("participants", 0),
+            "verified": regs.get("verified", 0),
+            "checkedIn": regs.get("checkedIn", 0),
         }
         if is_team:
-            team_count = teams.count_documents({"eventId": eid})
-            row["teams"] = team_count
+            tc = team_counts.get(ev["_id"], {})
+            row["teams"] = tc.get("teams", 0)
+            row["paidTeams"] = tc.get("paidTeams", 0)
         results.append(row)
 
-    # Sort by participants ascending (least first)
-    results.sort(key=lambda x: x["participants"])
-
-    # Take top N
-    top = results[: args.top]
+    # Top N by participants ascending (least first)
+    top = heapq.nsmallest(top_n, results, key=lambda x: x["participants"])
 
     print(f"\nTop {len(top)} events with LEAST participants:\n")
-    print(f"{'#':<4} {'Event':<35} {'Participants':<12} {'Teams':<8} {'Type'}")
-    print("-" * 75)
+    print(f"{'#':<4} {'Event':<35} {'Participants':<12} {'Verified':<9} {'CheckedIn':<10} "
+          f"{'Teams':<8} {'Paid':<6} {'Type'}")
+    print("-" * 100)
 
     for i, r in enumerate(top, 1):
         ev_name = (r["eventName"] or "")[:34]
         parts = r["participants"]
         teams_str = str(r["teams"]) if r.get("teams") is not None else "-"
+        paid_str = str(r["paidTeams"]) if r.get("paidTeams") is not None else "-"
         ev_type = "Team" if r["isTeamEvent"] else "Solo"
-        print(f"{i:<4} {ev_name:<35} {parts:<12} {teams_str:<8} {ev_type}")
+        print(f"{i:<4} {ev_name:<35} {parts:<12} {r['verified']:<9} {r['checkedIn']:<10} "
+              f"{teams_str:<8} {paid_str:<6} {ev_type}")
 
     print()
 
@@ -3,9 +3,12 @@
 Find events whose registrations are closed (isActive = false).
 Shows participant count and team count for context.
 
-Usage: python scripts/events_registrations_closed.py
+Usage: python scripts/events_registrations_closed.py [--from-stats | --from-snapshot]
+       --from-stats reads the precomputed event_stats collection (scripts/event_stats.py)
+       --from-snapshot reads the local Parquet snapshot (scripts/analytics_cache.py), no Mongo access
 """
 
+import argparse
 import os
 import sys
 from pathlib import Path
@@ -38,7 +41,48 @@ def get_db(client):
     return None
 
 
+def closed_from_snapshot():
+    """Closed events with participant/team counts, from the local snapshot."""
+    from analytics_cache import load_snapshot
+
+    events = load_snapshot("events")
+    if "isActive" not in events:
+        return []
+    events = events[events["isActive"].eq(False)].astype(object)
+    events = events.where(events.notna(), None)
+    regs = load_snapshot("registrations")
+    teams = load_snapshot("teams")
+    reg_counts = regs["eventId"].value_counts() if "eventId" in regs else {}
+    team_counts = teams["eventId"].value_counts() if "eventId" in teams else {}
+
+    results = []
+    for ev in events.to_dict("records"):
+        is_team = ev.get("isTeamEvent") or False
+        row = {
+            "eventName": ev["eventName"],
+            "category": ev.get("category") or "",
+            "date": ev.get("date") or "",
+            "time": ev.get("time") or "",
+            "isTeamEvent": is_team,
+            "participants": int(reg_counts.get(ev["_id"], 0)),
+        }
+        if is_team:
+            row["teams"] = int(team_counts.get(ev["_id"], 0))
+        results.append(row)
+    return results
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Events with registrations closed")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--from-stats", action="store_true", help="Read counts from event_stats instead of recounting")
+    source.add_argument("--from-snapshot", action="store_true", help="Answer from the local snapshot without touching Mongo")
+    args = parser.parse_args()
+
+    if args.from_snapshot:
+        print_closed(closed_from_snapshot())
+        return
+
     uri = os.getenv("MONGODB_URI")
     if not uri:
         print("MONGODB_URI not set in env", file=sys.stderr)
@@ -57,10 +101,18 @@ def main():
     # Events where isActive === false (registrations closed)
     closed = list(events.find({"isActive": False}, {"_id": 1, "eventName": 1, "isTeamEvent": 1, "category": 1, "date": 1, "time": 1}))
 
+    stats = {}
+    if args.from_stats and closed:
+        # Precomputed by scripts/event_stats.py
+        stats = {s["_id"]: s for s in db["event_stats"].find({"_id": {"$in": [ev["_id"] for ev in closed]}})}
+
     results = []
     for ev in closed:
         eid = ev["_id"]
-        participant_count = registrations.count_documents({"eventId": eid})
+        if args.from_stats:
+            participant_count = stats.get(eid, {}).get("registrations", 0)
+        else:
+            participant_count = registrations.count_documents({"eventId": eid})
         is_team = ev.get("isTeamEvent", False)
 
         row = {
@@ -72,10 +124,18 @@ def main():
             "participants": participant_count,
         }
         if is_team:
-            team_count = teams.count_documents({"eventId": eid})
+            if args.from_stats:
+                team_count = stats.get(eid, {}).get("teams", 0)
+            else:
+                team_count = teams.count_documents({"eventId": eid})
             row["teams"] = team_count
         results.append(row)
 
+    client.close()
+    print_closed(results)
+
+
+def print_closed(results):
     # Sort by event name
     results.sort(key=lambda x: (x["eventName"] or "").lower())
 
@@ -1,9 +1,13 @@
 from pymongo import MongoClient
 import pandas as pd
+import argparse
 import re
 import os
+from itertools import islice
 from dotenv import load_dotenv
 
+from sheet_export import write_rows
+
 load_dotenv()
 
 # -----------------------------
@@ -12,21 +16,23 @@ load_dotenv()
 SOURCE_URI = os.getenv("MONGODB_URI")
 DB_NAME = os.getenv("DB_NAME")
 
-if not SOURCE_URI or not DB_NAME:
-    raise Exception("MONGODB_URI or DB_NAME environment variable not set")
-
-# -----------------------------
-# Mongo Connection
-# -----------------------------
-client = MongoClient(SOURCE_URI)
-db = client[DB_NAME]
+USER_FIELDS = ["username", "email", "fullName", "phoneNumber", "college", "stream"]
 
-registrations = db["registrations"]
-users = db["users"]
+OUTPUT_FILE = "external_participants.xlsx"
+OUTPUT_HEADERS = ["Name", "Username", "Email", "Phone", "College", "Stream"]
+CLASSIFY_CHUNK = 5000
 
 # -----------------------------
 # College Normalization
 # -----------------------------
+PUNCTUATION = re.compile(r"[^a-z0-9\s]")
+SPACES = re.compile(r"\s+")
+
+# Every "heritage ..." variant contains "heritage"; the short forms must be whole
+# words so "hit" no longer matches inside names like "white field" or "chitkara"
+HERITAGE = re.compile(r"heritage|\bhitk?\b")
+
+
 def normalize_college(college):
     if not college:
         return ""
@@ -34,74 +40,123 @@ def normalize_college(college):
     college = college.lower()
 
     # remove punctuation
-    college = re.sub(r"[^a-z0-9\s]", "", college)
+    college = PUNCTUATION.sub("", college)
 
     # collapse spaces
-    college = re.sub(r"\s+", " ", college).strip()
+    college = SPACES.sub(" ", college).strip()
 
     return college
 
 
-def is_heritage(college):
-    college = normalize_college(college)
-
-    heritage_patterns = [
-        "heritage institute of technology",
-        "heritage institute technology",
-        "heritage technology",
-        "heritage",
-        "hitk",
-        "hit",
-        "heritage institute",
-    ]
-
-    for pattern in heritage_patterns:
-        if pattern in college:
-            return True
-
-    return False
+# Raw college string -> is heritage; colleges repeat heavily across chunks, so each
+# distinct spelling is normalized and matched once per run
+HERITAGE_CACHE = {}
 
 
-# -----------------------------
-# Get unique registered users
-# -----------------------------
-registered_user_ids = registrations.distinct("participant")
-
-users_data = users.find(
-    {"_id": {"$in": registered_user_ids}},
-    {
-        "username": 1,
-        "email": 1,
-        "fullName": 1,
-        "phoneNumber": 1,
-        "college": 1,
-        "stream": 1
-    }
-)
-
-filtered_users = []
-
-for user in users_data:
+def is_heritage(college):
+    match = HERITAGE_CACHE.get(college)
+    if match is None:
+        match = HERITAGE_CACHE[college] = HERITAGE.search(normalize_college(college)) is not None
+    return match
 
-    college = user.get("college", "")
 
-    if not is_heritage(college):
-        filtered_users.append({
-            "Name": user.get("fullName"),
-            "Username": user.get("username"),
-            "Email": user.get("email"),
-            "Phone": user.get("phoneNumber"),
-            "College": college,
-            "Stream": user.get("stream")
-        })
+def heritage_mask(colleges):
+    """
+    Boolean array over a Series of raw college strings. Each distinct string in the
+    chunk is looked up once (see is_heritage); the result is broadcast back to every row.
+    """
+    codes, distinct = pd.factorize(colleges.fillna("").astype(str))
+    return pd.Series([is_heritage(c) for c in distinct], dtype=bool).to_numpy()[codes]
 
 
 # -----------------------------
-# Convert to Excel
+# Get unique registered users
 # -----------------------------
-df = pd.DataFrame(filtered_users)
-
-df.to_excel("external_participants.xlsx", index=False)
-
-print("Excel file generated: external_participants.xlsx")
-print("Total external participants:", len(df))
\ No newline at end of file
+def registered_users_from_mongo(client, prefilter=True):
+    """
+    Stream the registered users straight from the server: registrations are grouped
+    by participant and joined to users with only USER_FIELDS projected, so no ID
+    list makes a round trip. With `prefilter`, colleges that plainly contain
+    "heritage" are dropped server-side; heritage_mask() still decides the rest.
+    """
+    db = client[DB_NAME]
+
+    user_pipeline = []
+    if prefilter:
+        user_pipeline.append({"$match": {"college": {"$not": re.compile("heritage", re.IGNORECASE)}}})
+    user_pipeline.append({"$project": {field: 1 for field in USER_FIELDS}})
+
+    return db["registrations"].aggregate([
+        {"$group": {"_id": "$participant"}},
+        {"$lookup": {
+            "from": "users",
+            "localField": "_id",
+            "foreignField": "_id",
+            "pipeline": user_pipeline,
+            "as": "user",
+        }},
+        {"$unwind": "$user"},
+        {"$replaceRoot": {"newRoot": "$user"}},
+    ], allowDiskUse=True)
+
+
+def registered_users_from_snapshot():
+    # Local Parquet snapshot (scripts/analytics_cache.py); no Mongo access
+    from analytics_cache import load_snapshot
+
+    registrations = load_snapshot("registrations")
+    users = load_snapshot("users")
+    if "participant" not in registrations or users.empty:
+        return []
+
+    users = users[users["_id"].isin(registrations["participant"].dropna().unique())]
+    users = users.reindex(columns=USER_FIELDS).astype(object)
+    return users.where(users.notna(), None).to_dict("records")
+
+
+def external_rows(users_data):
+    """Output rows for non-Heritage users, classified CLASSIFY_CHUNK users at a time."""
+    users_data = iter(users_data)
+    while True:
+        chunk = list(islice(users_data, CLASSIFY_CHUNK))
+        if not chunk:
+            return
+        users = pd.DataFrame(chunk).reindex(columns=USER_FIELDS).astype(object)
+        users = users.where(users.notna(), None)
+
+        # Classify the whole college column of the chunk at once
+        for user in users[~heritage_mask(users["college"])].itertuples(index=False):
+            yield [user.fullName, user.username, user.email, user.phoneNumber, user.college, user.stream]
+
+
+def export_external_participants(users_data, output=OUTPUT_FILE):
+    # -----------------------------
+    # Stream to Excel / CSV
+    # -----------------------------
+    total = write_rows(output, OUTPUT_HEADERS, external_rows(users_data), title="External Participants")
+
+    print(f"File generated: {output}")
+    print("Total external participants:", total)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export non-Heritage registered participants")
+    parser.add_argument("--from-snapshot", action="store_true",
+                        help="Read the local snapshot (scripts/analytics_cache.py) instead of Mongo")
+    parser.add_argument("--output", default=OUTPUT_FILE,
+                        help=f"Output file, .xlsx or .csv (default: {OUTPUT_FILE})")
+    parser.add_argument("--no-prefilter", action="store_true",
+                        help="Classify every college client-side (no server-side pre-filter)")
+    args = parser.parse_args()
+
+    if args.from_snapshot:
+        export_external_participants(registered_users_from_snapshot(), args.output)
+    else:
+        if not SOURCE_URI or not DB_NAME:
+            raise Exception("MONGODB_URI or DB_NAME environment variable not set")
+
+        client = MongoClient(SOURCE_URI)
+        export_external_participants(
+            registered_users_from_mongo(client, prefilter=not args.no_prefilter), args.output
+        )
+        client.close()
@@ -1,14 +1,24 @@
 #!/usr/bin/env python3
 """
-Fetch ALL data connected to a user (by _id or fullName).
+Fetch ALL data connected to a user (by _id, username, fullName, email or phone; names are
+resolved through the local search index, scripts/user_index.py, and must match exactly one
+user; otherwise the closest candidates are printed and nothing is exported).
 Usage: python scripts/fetch_user_full_context.py <user_id|fullName>
+
+Bulk mode: one user _id, email, username or fullName per line, matched the same way; one
+compact JSON record per line (NDJSON), resolved --batch-size users at a time. A line that
+matches several users exactly yields {"query", "error": "ambiguous", "candidates"} instead.
+  python scripts/fetch_user_full_context.py --bulk ids.txt [--output contexts.ndjson]
 """
 
+import argparse
 import os
 import sys
 import json
+from collections import defaultdict
 from pathlib import Path
 from datetime import datetime
+from itertools import islice
 
 root = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(root))
@@ -21,8 +31,11 @@ load_dotenv(root / ".env")
 from pymongo import MongoClient
 from bson import ObjectId
 
+from user_index import EXACT, UserIndex, is_object_id, print_candidates, resolve_user
+
 
 USER_ID = "699450b777a3687fa08aa640"
+BULK_BATCH = 200
 
 
 def json_serial(obj):
@@ -45,14 +58,221 @@ def serialize(d):
     return d
 
 
+PERSON_FIELDS = {"username": 1, "fullName": 1, "email": 1}
+
+
+def seminar_collections(db):
+    names = db.list_collection_names()
+    sem_coll = "SeminarRegistration" if "SeminarRegistration" in names else "seminarregistrations"
+    sem_ref = "Seminar" if "Seminar" in names else "seminars"
+    return sem_coll, sem_ref
+
+
+def by_id(coll, ids, projection=None):
+    """{_id: doc} for all `ids` with a single $in query."""
+    ids = list({i for i in ids if i is not None})
+    if not ids:
+        return {}
+    return {d["_id"]: d for d in coll.find({"_id": {"$in": ids}}, projection)}
+
+
+def fetch_contexts(db, users, seminar_names=None):
+    """
+    Everything connected to each of `users` (a batch of user docs), in the same order.
+    Each collection is queried once for the whole batch: registrations, teams and
+    seminar registrations first, then the events, users and seminars they reference
+    with one $in query per collection, however many documents reference them.
+    `seminar_names` is seminar_collections(db), looked up here when not given.
+    """
+    ids = [u["_id"] for u in users]
+    wanted = set(ids)
+    sem_coll, sem_ref = seminar_names or seminar_collections(db)
+
+    regs = defaultdict(list)
+    for r in db["registrations"].find({"participant": {"$in": ids}}):
+        regs[r.get("participant")].append(r)
+    regs_by = defaultdict(list)
+    for r in db["registrations"].find({"checkedInBy": {"$in": ids}}):
+        regs_by[r.get("checkedInBy")].append(r)
+    teams_lead = defaultdict(list)
+    for t in db["teams"].find({"teamLeader": {"$in": ids}}):
+        teams_lead[t.get("teamLeader")].append(t)
+    teams_mem = defaultdict(list)
+    for t in db["teams"].find({"team": {"$in": ids}}):
+        for m in set(t.get("team", [])) & wanted:
+            teams_mem[m].append(t)
+    sem_regs = defaultdict(list)
+    for sr in db[sem_coll].find({"participant": {"$in": ids}}):
+        sem_regs[sr.get("participant")].append(sr)
+
+    all_regs = [r for docs in regs.values() for r in docs] + [r for docs in regs_by.values() for r in docs]
+    all_lead = [t for docs in teams_lead.values() for t in docs]
+    all_mem = [t for docs in teams_mem.values() for t in docs]
+
+    events = by_id(db["events"], [d.get("eventId") for d in all_regs + all_lead + all_mem], {"eventName": 1})
+    people = by_id(
+        db["users"],
+        [r.get("participant") for docs in regs_by.values() for r in docs]
+        + [m for t in all_lead for m in t.get("team", [])]
+        + [t.get("teamLeader") for t in all_mem],
+        PERSON_FIELDS,
+    )
+    seminars = by_id(db[sem_ref], [sr.get("seminarId") for docs in sem_regs.values() for sr in docs], {"title": 1})
+
+    def event_name(doc):
+        ev = events.get(doc.get("eventId"))
+        return ev["eventName"] if ev else None
+
+    results = []
+    for user in users:
+        oid = user["_id"]
+        result = {
+            "user": serialize(dict(user)),
+            "registrations_as_participant": [],
+            "registrations_checked_in_by_user": [],
+            "teams_as_leader": [],
+            "teams_as_member": [],
+            "seminar_registrations": [],
+        }
+
+        # 1. Registrations where this user is the participant
+        for r in regs[oid]:
+            r_dict = serialize(dict(r))
+            r_dict["eventName"] = event_name(r)
+            result["registrations_as_participant"].append(r_dict)
+
+        # 2. Registrations where this user did the check-in (checkedInBy)
+        for r in regs_by[oid]:
+            r_dict = serialize(dict(r))
+            r_dict["eventName"] = event_name(r)
+            r_dict["checkedInParticipant"] = people.get(r.get("participant"))
+            result["registrations_checked_in_by_user"].append(r_dict)
+
+        # 3. Teams where this user is teamLeader
+        for t in teams_lead[oid]:
+            t_dict = serialize(dict(t))
+            t_dict["eventName"] = event_name(t)
+            t_dict["members"] = [people[m] for m in t.get("team", []) if m in people]
+            result["teams_as_leader"].append(t_dict)
+
+        # 4. Teams where this user is in team[] (member, not leader)
+        for t in teams_mem[oid]:
+            t_dict = serialize(dict(t))
+            t_dict["eventName"] = event_name(t)
+            t_dict["teamLeaderInfo"] = people.get(t.get("teamLeader"))
+            result["teams_as_member"].append(t_dict)
+
+        # 5. Seminar registrations (collection: SeminarRegistration)
+        for sr in sem_regs[oid]:
+            sem = seminars.get(sr.get("seminarId"))
+            sr_dict = serialize(dict(sr))
+            sr_dict["seminarTitle"] = sem["title"] if sem else None
+            result["seminar_registrations"].append(sr_dict)
+
+        results.append(result)
+    return results
+
+
+def fetch_full_context(db, user):
+    """Everything connected to one user (see fetch_contexts)."""
+    return fetch_contexts(db, [user])[0]
+
+
+def resolve_users(users, idents, index):
+    """
+    [(ident, [user docs])] for a batch of identifiers: _ids directly, anything else
+    (email, username, fullName, phone) through exact matches in the local user index.
+    One users query for the whole batch. An identifier is only resolved when exactly one
+    live user matches it; more than one (e.g. a shared fullName) comes back as all of
+    them for the caller to report as ambiguous.
+    """
+    wanted = {}
+    for ident in idents:
+        if is_object_id(ident):
+            wanted[ident] = [ObjectId(ident)]
+        else:
+            wanted[ident] = [ObjectId(c["id"]) for c in index.search(ident, limit=50) if c["score"] == EXACT]
+
+    ids = list({oid for oids in wanted.values() for oid in oids})
+    docs = {d["_id"]: d for d in users.find({"_id": {"$in": ids}})} if ids else {}
+    return [(ident, [docs[oid] for oid in wanted[ident] if oid in docs]) for ident in idents]
+
+
+def ambiguous_record(ident, docs):
+    """NDJSON record for an identifier matching several users: who matched, nothing exported."""
+    return {
+        "query": ident,
+        "error": "ambiguous",
+        "candidates": [
+            {"id": str(u["_id"]), "username": u.get("username"), "fullName": u.get("fullName")}
+            for u in docs
+        ],
+    }
+
+
+def read_idents(path):
+    """Non-empty, non-comment lines of `path`, lazily."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def export_bulk(db, idents, out, batch_size):
+    """
+    Write one NDJSON record per identifier to `out`: the user's context, or an error
+    ("not found", or "ambiguous" with the matching users, none of whom is exported).
+    Returns (found, missing, ambiguous).
+    """
+    found = missing = ambiguous = 0
+    idents = iter(idents)
+    index = UserIndex()
+    index.refresh(db["users"])
+    seminar_names = seminar_collections(db)  # once for the run, not per batch
+    while True:
+        batch = list(islice(idents, batch_size))
+        if not batch:
+            break
+        resolved = resolve_users(db["users"], batch, index)
+
+        # A user named by several lines of the batch is exported once
+        users = {}
+        for _, docs in resolved:
+            if len(docs) == 1:
+                users.setdefault(docs[0]["_id"], docs[0])
+        contexts = dict(zip(users, fetch_contexts(db, list(users.values()), seminar_names))) if users else {}
+
+        for ident, docs in resolved:
+            if not docs:
+                out.write(json.dumps({"query": ident, "error": "not found"}) + "\n")
+                missing += 1
+            elif len(docs) > 1:
+                out.write(json.dumps(ambiguous_record(ident, docs), separators=(",", ":")) + "\n")
+                ambiguous += 1
+            else:
+                record = {"query": ident, **contexts[docs[0]["_id"]]}
+                out.write(json.dumps(record, default=json_serial, separators=(",", ":")) + "\n")
+                found += 1
+    index.close()
+    return found, missing, ambiguous
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Fetch all data connected to a user")
+    parser.add_argument("ident", nargs="?", default=USER_ID, help="User _id, username, fullName, email or phone")
+    parser.add_argument("--bulk", metavar="FILE", help="File with one user _id, email, username or fullName per line")
+    parser.add_argument("--output", help="NDJSON output file for --bulk (default: stdout)")
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH, help=f"Users resolved per batch (default: {BULK_BATCH})")
+    args = parser.parse_args()
+
     uri = os.getenv("MONGODB_URI")
     db_name = os.getenv("DB_NAME")
     if not uri:
         print("MONGODB_URI not set", file=sys.stderr)
         sys.exit(1)
 
-    ident = sys.argv[1] if len(sys.argv) > 1 else USER_ID
+    ident = args.ident
     client = MongoClient(uri)
 
     if db_name:
@@ -75,80 +295,30 @@ def main():
             print("No suitable database found", file=sys.stderr)
             sys.exit(1)
 
-    oid = None
-    if len(ident) == 24 and all(c in "0123456789abcdef" for c in ident.lower()):
+    if args.bulk:
+        out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
         try:
-            oid = ObjectId(ident)
-        except Exception:
-            pass
-
-    users = db["users"]
-    if oid:
-        user = users.find_one({"_id": oid})
-    else:
-        user = users.find_one({"fullName": ident})
-        if user:
-            oid = user["_id"]
+            found, missing, ambiguous = export_bulk(db, read_idents(args.bulk), out, args.batch_size)
+        finally:
+            if args.output:
+                out.close()
+        print(f"Exported {found} user context(s); {missing} identifier(s) not found, {ambiguous} ambiguous",
+              file=sys.stderr)
+        client.close()
+        return
 
+    # Exports personal data, so only an unambiguous exact match is used
+    user, candidates = resolve_user(db, ident, exact_only=True)
     if not user:
-        print(f"User not found: {ident}", file=sys.stderr)
+        if candidates:
+            exact = [c for c in candidates if c["score"] == EXACT]
+            print(f"{'Ambiguous' if len(exact) > 1 else 'No exact match for'} '{ident}', candidates:", file=sys.stderr)
+            print_candidates(candidates[:5])
+        else:
+            print(f"User not found: {ident}", file=sys.stderr)
         sys.exit(1)
 
-    result = {
-        "user": serialize(dict(user)),
-        "registrations_as_participant": [],
-        "registrations_checked_in_by_user": [],
-        "teams_as_leader": [],
-        "teams_as_member": [],
-        "seminar_registrations": [],
-    }
-
-    # 1. Registrations where this user is the participant
-    regs = db["registrations"].find({"participant": oid})
-    for r in regs:
-        ev = db["events"].find_one({"_id": r["eventId"]})
-        r_dict = serialize(dict(r))
-        r_dict["eventName"] = ev["eventName"] if ev else None
-        result["registrations_as_participant"].append(r_dict)
-
-    # 2. Registrations where this user did the check-in (checkedInBy)
-    regs_by = db["registrations"].find({"checkedInBy": oid})
-    for r in regs_by:
-        ev = db["events"].find_one({"_id": r["eventId"]})
-        part = db["users"].find_one({"_id": r["participant"]}, {"username": 1, "fullName": 1, "email": 1})
-        r_dict = serialize(dict(r))
-        r_dict["eventName"] = ev["eventName"] if ev else None
-        r_dict["checkedInParticipant"] = part
-        result["registrations_checked_in_by_user"].append(r_dict)
-
-    # 3. Teams where this user is teamLeader
-    teams_lead = db["teams"].find({"teamLeader": oid})
-    for t in teams_lead:
-        ev = db["events"].find_one({"_id": t["eventId"]})
-        members = list(db["users"].find({"_id": {"$in": t.get("team", [])}}, {"username": 1, "fullName": 1, "email": 1}))
-        t_dict = serialize(dict(t))
-        t_dict["eventName"] = ev["eventName"] if ev else None
-        t_dict["members"] = members
-        result["teams_as_leader"].append(t_dict)
-
-    # 4. Teams where this user is in team[] (member, not leader)
-    teams_mem = db["teams"].find({"team": oid})
-    for t in teams_mem:
-        ev = db["events"].find_one({"_id": t["eventId"]})
-        leader = db["users"].find_one({"_id": t["teamLeader"]}, {"username": 1, "fullName": 1, "email": 1})
-        t_dict = serialize(dict(t))
-        t_dict["eventName"] = ev["eventName"] if ev else None
-        t_dict["teamLeaderInfo"] = leader
-        result["teams_as_member"].append(t_dict)
-
-    # 5. Seminar registrations (collection: SeminarRegistration)
-    sem_coll = "SeminarRegistration" if "SeminarRegistration" in db.list_collection_names() else "seminarregistrations"
-    sem_ref = "Seminar" if "Seminar" in db.list_collection_names() else "seminars"
-    for sr in db[sem_coll].find({"participant": oid}):
-        sem = db[sem_ref].find_one({"_id": sr["seminarId"]})
-        sr_dict = serialize(dict(sr))
-        sr_dict["seminarTitle"] = sem["title"] if sem else None
-        result["seminar_registrations"].append(sr_dict)
+    result = fetch_full_context(db, user)
 
     print(json.dumps(result, indent=2, default=json_serial))
 
@@ -1,97 +1,146 @@
-import pandas as pd
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
+import argparse
 import os
 from dotenv import load_dotenv
+from payment_ledger import DONE, FAILED, PaymentLedger
+from payment_export import CHUNK_ROWS, has_value, read_export_chunks
 
 # --- CONFIGURATION ---
 load_dotenv()
 MONGODB_URI = os.getenv("MONGODB_URI")
 DB_NAME = os.getenv("DB_NAME")
-EXCEL_FILE = "solo.xlsx"
+EXCEL_FILE = "solo.xlsx" # .xlsx or .csv
 
-def update_solo_registrations_with_payment_check():
-    # 1. Connect to MongoDB
-    client = MongoClient(MONGODB_URI)
-    db = client[DB_NAME]
-    
-    # Collections
+
+def reconcile_solo_rows(db, df):
+    """
+    Verify solo registrations for every paid row in `df`.
+    Emails, event names and existing registrations are resolved with one query each,
+    and all verifications go out as one unordered bulk_write.
+    Returns {row index: (ledger status, detail)} for every row that has payment IDs.
+    """
     events_col = db["events"]
     users_col = db["users"]
     registrations_col = db["registrations"]
 
-    # 2. Read Excel
-    try:
-        df = pd.read_excel(EXCEL_FILE)
-    except Exception as e:
-        print(f"Error reading Excel: {e}")
-        return
+    # 3. Payment & Order ID Validation (whole columns at once)
+    emails = df['Email'].astype(str).str.strip().str.lower()
+    event_names = df['EventName'].astype(str).str.strip()
+    paid = has_value(df['Payment_id']) & has_value(df['Order_id'])
 
-    # Check if necessary columns exist in the Excel file at all
-    required_columns = ['Email', 'EventName', 'Payment_id', 'Order_id']
-    if not all(col in df.columns for col in required_columns):
-        print(f"Error: Excel is missing one of the required columns: {required_columns}")
-        return
-
-    for index, row in df.iterrows():
-        email = str(row['Email']).strip().lower()
-        event_name = str(row['EventName']).strip()
-        
-        # 3. Payment & Order ID Validation
-        payment_id = row['Payment_id']
-        order_id = row['Order_id']
-
-        # Check if both exist (not NaN, not None, not empty string)
-        is_payment_valid = pd.notna(payment_id) and str(payment_id).strip() != ""
-        is_order_valid = pd.notna(order_id) and str(order_id).strip() != ""
+    # 4-5. Resolve every referenced user and event in one round trip each
+    user_ids = {
+        u["email"]: u["_id"]
+        for u in users_col.find({"email": {"$in": emails[paid].unique().tolist()}}, {"email": 1})
+    }
+    event_ids = {
+        e["eventName"]: e["_id"]
+        for e in events_col.find({"eventName": {"$in": event_names[paid].unique().tolist()}}, {"eventName": 1})
+    }
+    verified = {}
+    if user_ids and event_ids:
+        for r in registrations_col.find(
+            {
+                "participant": {"$in": list(user_ids.values())},
+                "eventId": {"$in": list(event_ids.values())},
+                "isInTeam": False
+            },
+            {"participant": 1, "eventId": 1, "verified": 1}
+        ):
+            key = (r["participant"], r["eventId"])
+            verified[key] = verified.get(key, False) or r.get("verified", False)
 
-        if not (is_payment_valid and is_order_valid):
-            print(f"\n[SKIP] Row {index + 2}: User '{email}' - Missing Payment ID or Order ID.")
+    # 6. Per-row outcome computed in memory, updates collected for one bulk write
+    report = []
+    ops = []
+    outcomes = {}
+    for index, email, event_name, is_paid in zip(df.index, emails, event_names, paid):
+        if not is_paid:
+            report.append(f"\n[SKIP] Row {index + 2}: User '{email}' - Missing Payment ID or Order ID.")
             continue
 
-        print(f"\n[PROCESS] Row {index + 2}: User '{email}' for Event '{event_name}'...")
+        report.append(f"\n[PROCESS] Row {index + 2}: User '{email}' for Event '{event_name}'...")
 
-        # 4. Find User ID by Email
-        user = users_col.find_one({"email": email})
-        if not user:
-            print(f"  [!] User not found with email: {email}")
+        user_id = user_ids.get(email)
+        if not user_id:
+            report.append(f"  [!] User not found with email: {email}")
+            outcomes[index] = (FAILED, "user not found")
             continue
-        user_id = user['_id']
 
-        # 5. Find Event ID by Name
-        event = events_col.find_one({"eventName": event_name})
-        if not event:
-            print(f"  [!] Event not found: {event_name}")
+        event_id = event_ids.get(event_name)
+        if not event_id:
+            report.append(f"  [!] Event not found: {event_name}")
+            outcomes[index] = (FAILED, "event not found")
             continue
-        event_id = event['_id']
 
-        # 6. Update Registration
-        # Only verify if it's a solo registration (isInTeam: False)
-        result = registrations_col.update_one(
-            {
-                "participant": user_id,
-                "eventId": event_id,
-                "isInTeam": False
-            },
-            {
-                "$set": {
-                    "verified": True
-                    # If you want to store these IDs in the DB, uncomment below:
-                    # "paymentId": payment_id,
-                    # "orderId": order_id
-                }
-            }
-        )
-
-        if result.matched_count > 0:
-            if result.modified_count > 0:
-                print(f"  [+] Success: Set verified to True (Payment IDs verified).")
-            else:
-                print(f"  [-] Info: Already verified.")
+        key = (user_id, event_id)
+        if key not in verified:
+            report.append(f"  [!] No registration record found for this User/Event combo.")
+            outcomes[index] = (FAILED, "no registration")
+        elif verified[key]:
+            report.append(f"  [-] Info: Already verified.")
+            outcomes[index] = (DONE, "already verified")
         else:
-            print(f"  [!] No registration record found for this User/Event combo.")
+            # Only verify if it's a solo registration (isInTeam: False); updatedAt is bumped
+            # like the app's mongoose timestamps, so incremental event stats see the change
+            ops.append(UpdateOne(
+                {"participant": user_id, "eventId": event_id, "isInTeam": False},
+                {"$set": {"verified": True}, "$currentDate": {"updatedAt": True}}
+            ))
+            verified[key] = True
+            report.append(f"  [+] Success: Set verified to True (Payment IDs verified).")
+            outcomes[index] = (DONE, "verified")
+
+    if ops:
+        registrations_col.bulk_write(ops, ordered=False)
+
+    for line in report:
+        print(line)
+    return outcomes
+
+
+def update_solo_registrations_with_payment_check(path=EXCEL_FILE, replay=None, chunk_rows=CHUNK_ROWS):
+    # 1. Connect to MongoDB
+    client = MongoClient(MONGODB_URI)
+    db = client[DB_NAME]
+    ledger = PaymentLedger("solo")
+    required_columns = ['Email', 'EventName', 'Payment_id', 'Order_id']
+    ledger_skipped = 0
+    replayed = 0
+
+    # 2. Stream the export: each chunk is reconciled before the next one is read
+    try:
+        for df in read_export_chunks(path, chunk_rows):
+            # Check if necessary columns exist in the Excel file at all
+            if not all(col in df.columns for col in required_columns):
+                print(f"Error: Excel is missing one of the required columns: {required_columns}")
+                return
+
+            # Skip orders the ledger already has as done (or take just the replayed order)
+            pending = ledger.pending(df, replay=replay)
+            ledger_skipped += len(df) - len(pending)
+            replayed += len(pending)
 
+            outcomes = reconcile_solo_rows(db, pending)
+            ledger.record(pending, outcomes)
+    except Exception as e:
+        print(f"Error processing {path}: {e}")
+        return
+    finally:
+        ledger.close()
+        client.close()
+
+    if replay is not None:
+        print(f"\nReplayed Order_id {replay}: {replayed} row(s)")
+    else:
+        print(f"\nLedger: skipped {ledger_skipped} already processed row(s)")
     print("\n--- Processing Complete ---")
-    client.close()
 
 if __name__ == "__main__":
-    update_solo_registrations_with_payment_check()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Verify paid solo registrations from the payment export")
+    parser.add_argument("file", nargs="?", default=EXCEL_FILE, help=f"Payment export .xlsx/.csv (default: {EXCEL_FILE})")
+    parser.add_argument("--replay", metavar="ORDER_ID", help="Reprocess this order even if the ledger has it")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help=f"Rows per chunk (default: {CHUNK_ROWS})")
+    args = parser.parse_args()
+
+    update_solo_registrations_with_payment_check(args.file, replay=args.replay, chunk_rows=args.chunk_rows)
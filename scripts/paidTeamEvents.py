@@ -1,75 +1,99 @@
-import pandas as pd
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne, UpdateMany
 from bson import ObjectId
+import argparse
 import os
 from dotenv import load_dotenv
+from payment_ledger import DONE, FAILED, PaymentLedger
+from payment_export import CHUNK_ROWS, has_value, read_export_chunks
 
 # --- CONFIGURATION ---
 load_dotenv()
 MONGODB_URI = os.getenv("MONGODB_URI")
 DB_NAME = os.getenv("DB_NAME")
-EXCEL_FILE = "team.xlsx"
+EXCEL_FILE = "team.xlsx" # .xlsx or .csv
 
-def update_teams_from_excel():
-    client = MongoClient(MONGODB_URI)
-    db = client[DB_NAME]
-    
+
+def reconcile_team_rows(db, df):
+    """
+    Mark teams paid / registrations verified for every paid row in `df`.
+    Leaders, events, teams and unverified-member counts are prefetched in bulk,
+    the team-name back-reference is checked in memory, and the updates go out
+    as two unordered bulk writes. Returns (success_count, skipped_count, outcomes)
+    where outcomes maps row index -> (ledger status, detail) for rows with payment IDs.
+    """
     events_col = db["events"]
     teams_col = db["teams"]
     registrations_col = db["registrations"]
     users_col = db["users"]
 
-    try:
-        df = pd.read_excel(EXCEL_FILE)
-    except Exception as e:
-        print(f"Error reading Excel: {e}")
-        return
+    # 1. TRANSACTION GATEKEEPER (whole columns at once)
+    paid = has_value(df['Order_id']) & has_value(df['Payment_id'])
+
+    # 2. Source of Trust: Email & Event
+    emails = df['Email'].astype(str).str.strip().str.lower()
+    team_names = df['Team Name'].astype(str).str.strip()
+    event_names = df['EventName'].astype(str).str.strip()
+
+    # 3-5. Prefetch events, leaders and their teams
+    event_ids = {
+        e["eventName"]: e["_id"]
+        for e in events_col.find({"eventName": {"$in": event_names[paid].unique().tolist()}}, {"eventName": 1})
+    }
+    user_ids = {
+        u["email"]: u["_id"]
+        for u in users_col.find({"email": {"$in": emails[paid].unique().tolist()}}, {"email": 1})
+    }
+    teams = {}
+    if event_ids and user_ids:
+        for t in teams_col.find(
+            {"teamLeader": {"$in": list(user_ids.values())}, "eventId": {"$in": list(event_ids.values())}},
+            {"teamLeader": 1, "eventId": 1, "teamName": 1}
+        ):
+            teams.setdefault((t["teamLeader"], t["eventId"]), t)
+
+    # Members each team update would verify (what update_many's modified_count used to report)
+    unverified = {}
+    if teams:
+        for g in registrations_col.aggregate([
+            {"$match": {"teamId": {"$in": [t["_id"] for t in teams.values()]}, "verified": {"$ne": True}}},
+            {"$group": {"_id": {"teamId": "$teamId", "eventId": "$eventId"}, "count": {"$sum": 1}}}
+        ]):
+            unverified[(g["_id"]["teamId"], g["_id"].get("eventId"))] = g["count"]
 
     skipped_count = 0
     success_count = 0
-
-    for index, row in df.iterrows():
-        # 1. TRANSACTION GATEKEEPER
-        # Check if both columns exist and are not empty/NaN
-        order_id = row.get('Order_id')
-        payment_id = row.get('Payment_id')
-
-        if pd.isna(order_id) or pd.isna(payment_id) or str(order_id).strip() == "" or str(payment_id).strip() == "":
+    team_ops = []
+    registration_ops = []
+    outcomes = {}
+
+    for index, is_paid, excel_email, excel_team_name, event_name in zip(
+        df.index, paid, emails, team_names, event_names
+    ):
+        if not is_paid:
             print(f"[!] Skipping Row {index + 2}: Missing Payment/Order ID.")
             skipped_count += 1
             continue
 
-        # 2. Source of Trust: Email & Event
-        excel_email = str(row['Email']).strip().lower()
-        excel_team_name = str(row['Team Name']).strip()
-        event_name = str(row['EventName']).strip()
-
         print(f"\n[Processing] Leader: {excel_email} | Event: {event_name}")
 
-        # 3. Get Event ID
-        event = events_col.find_one({"eventName": event_name})
-        if not event:
+        event_id = event_ids.get(event_name)
+        if not event_id:
             print(f"  [!] Event '{event_name}' not found.")
+            outcomes[index] = (FAILED, "event not found")
             skipped_count += 1
             continue
-        event_id = event['_id']
 
-        # 4. Find User by Email
-        user = users_col.find_one({"email": excel_email})
-        if not user:
+        user_id = user_ids.get(excel_email)
+        if not user_id:
             print(f"  [!] User '{excel_email}' not found in DB.")
+            outcomes[index] = (FAILED, "user not found")
             skipped_count += 1
             continue
-        user_id = user['_id']
-
-        # 5. Find Team linked to this leader and event
-        team = teams_col.find_one({
-            "teamLeader": user_id,
-            "eventId": event_id
-        })
 
+        team = teams.get((user_id, event_id))
         if not team:
             print(f"  [!] No team found for leader {excel_email} in this event.")
+            outcomes[index] = (FAILED, "team not found")
             skipped_count += 1
             continue
 
@@ -77,29 +101,77 @@ def update_teams_from_excel():
         db_team_name = team.get('teamName', '')
         if db_team_name.lower() != excel_team_name.lower():
             print(f"  [X] NAME MISMATCH: Excel '{excel_team_name}' vs DB '{db_team_name}'.")
+            outcomes[index] = (FAILED, "team name mismatch")
             skipped_count += 1
-            continue 
+            continue
 
         team_id = team['_id']
 
-        # 7. Perform Updates (No Transaction IDs stored here)
-        teams_col.update_one(
+        # 7. Queue Updates (No Transaction IDs stored here; updatedAt as mongoose would set it)
+        team_ops.append(UpdateOne(
             {"_id": team_id},
-            {"$set": {"paymentStatus": "completed"}}
-        )
-
-        reg_result = registrations_col.update_many(
+            {"$set": {"paymentStatus": "completed"}, "$currentDate": {"updatedAt": True}}
+        ))
+        registration_ops.append(UpdateMany(
             {"teamId": team_id, "eventId": event_id},
-            {"$set": {"verified": True}}
-        )
-        
-        print(f"  [+] Success: Team '{db_team_name}' verified. ({reg_result.modified_count} members)")
+            {"$set": {"verified": True}, "$currentDate": {"updatedAt": True}}
+        ))
+
+        # A repeated row for the same team verifies nobody new
+        members = unverified.pop((team_id, event_id), 0)
+        print(f"  [+] Success: Team '{db_team_name}' verified. ({members} members)")
+        outcomes[index] = (DONE, "verified")
         success_count += 1
 
+    if team_ops:
+        teams_col.bulk_write(team_ops, ordered=False)
+        registrations_col.bulk_write(registration_ops, ordered=False)
+
+    return success_count, skipped_count, outcomes
+
+
+def update_teams_from_excel(path=EXCEL_FILE, replay=None, chunk_rows=CHUNK_ROWS):
+    client = MongoClient(MONGODB_URI)
+    db = client[DB_NAME]
+    ledger = PaymentLedger("team")
+
+    skipped_count = 0
+    success_count = 0
+    ledger_skipped = 0
+    replayed = 0
+
+    # Stream the export: each chunk is reconciled before the next one is read
+    try:
+        for df in read_export_chunks(path, chunk_rows):
+            # Skip orders the ledger already has as done (or take just the replayed order)
+            pending = ledger.pending(df, replay=replay)
+            ledger_skipped += len(df) - len(pending)
+            replayed += len(pending)
+
+            success, skipped, outcomes = reconcile_team_rows(db, pending)
+            ledger.record(pending, outcomes)
+            success_count += success
+            skipped_count += skipped
+    except Exception as e:
+        print(f"Error processing {path}: {e}")
+        return
+    finally:
+        ledger.close()
+        client.close()
+
     print("\n--- Processing Complete ---")
+    if replay is not None:
+        print(f"Replayed Order_id {replay}: {replayed} row(s)")
+    else:
+        print(f"Ledger skipped:   {ledger_skipped}")
     print(f"Total Successful: {success_count}")
     print(f"Total Skipped:    {skipped_count}")
-    client.close()
 
 if __name__ == "__main__":
-    update_teams_from_excel()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Mark paid teams from the payment export")
+    parser.add_argument("file", nargs="?", default=EXCEL_FILE, help=f"Payment export .xlsx/.csv (default: {EXCEL_FILE})")
+    parser.add_argument("--replay", metavar="ORDER_ID", help="Reprocess this order even if the ledger has it")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help=f"Rows per chunk (default: {CHUNK_ROWS})")
+    args = parser.parse_args()
+
+    update_teams_from_excel(args.file, replay=args.replay, chunk_rows=args.chunk_rows)
@@ -0,0 +1,63 @@
+"""
+Chunked reader (and cell helpers) for payment-gateway exports, shared by paidSoloEvents.py and paidTeamEvents.py.
+
+XLSX files are streamed with openpyxl in read-only mode and CSV files with pandas' chunksize,
+so only CHUNK_ROWS rows are held in memory at a time. Each chunk is a DataFrame whose index
+continues from the previous chunk (0 = first data row), so `index + 2` is still the sheet row.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import load_workbook
+
+CHUNK_ROWS = 5000
+
+
+def has_value(col):
+    """Vectorized: not NaN/None and not an empty string."""
+    return col.notna() & col.astype(str).str.strip().ne("")
+
+
+def read_xlsx_chunks(path, chunk_rows):
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c).strip() if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+
+        # dtype=object keeps each cell as openpyxl read it: pandas would otherwise infer
+        # per chunk, so an ID column could be int64 in one chunk ("123") and float64 in
+        # the next ("123.0") as soon as a cell is empty
+        batch = []
+        positions = []
+        for position, row in enumerate(rows):
+            # Blank rows are dropped but keep their place in the numbering
+            if all(v is None for v in row):
+                continue
+            batch.append((tuple(row) + (None,) * len(columns))[:len(columns)])
+            positions.append(position)
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=columns, index=positions, dtype=object)
+                batch = []
+                positions = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns, index=positions, dtype=object)
+    finally:
+        wb.close()
+
+
+def read_csv_chunks(path, chunk_rows):
+    # dtype=str keeps IDs identical across chunks (no per-chunk int/float inference)
+    for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype=str):
+        chunk.columns = [str(c).strip() for c in chunk.columns]
+        yield chunk
+
+
+def read_export_chunks(path, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrame chunks of an .xlsx or .csv export."""
+    if Path(path).suffix.lower() == ".csv":
+        return read_csv_chunks(path, chunk_rows)
+    return read_xlsx_chunks(path, chunk_rows)
@@ -0,0 +1,90 @@
+"""
+Local ledger of processed payment-export rows, shared by paidSoloEvents.py and paidTeamEvents.py.
+
+Every row with an Order_id/Payment_id is recorded with its outcome:
+  done   - verified now, or already verified earlier; later runs skip it
+  failed - user/event/team not found, name mismatch, ...; later runs retry it
+Rows without both IDs are never recorded (they cannot be keyed and are always skipped).
+"""
+
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+LEDGER_FILE = Path(__file__).resolve().parent / "payment_ledger.sqlite3"
+
+DONE = "done"
+FAILED = "failed"
+
+
+def order_key(value):
+    """Normalize an Order_id/Payment_id cell the same way on every run (and in .xlsx and .csv)."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # a numeric cell Excel stored as 123.0
+    return str(value).strip()
+
+
+class PaymentLedger:
+    def __init__(self, kind, path=LEDGER_FILE):
+        self.kind = kind  # "solo" or "team"
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ledger (
+                kind TEXT NOT NULL,
+                order_id TEXT NOT NULL,
+                payment_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                detail TEXT,
+                processed_at TEXT NOT NULL,
+                PRIMARY KEY (kind, order_id, payment_id)
+            )
+            """
+        )
+
+    def done_keys(self, order_ids):
+        """(order_id, payment_id) pairs already `done` among the given order ids."""
+        order_ids = list(set(order_ids))
+        done = set()
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(order_ids), 500):
+            part = order_ids[i:i + 500]
+            done.update(self.conn.execute(
+                f"SELECT order_id, payment_id FROM ledger WHERE kind = ? AND status = ? "
+                f"AND order_id IN ({', '.join('?' * len(part))})",
+                (self.kind, DONE, *part),
+            ))
+        return done
+
+    def pending(self, df, replay=None):
+        """
+        Rows of `df` that still need processing: not yet `done`, or only the rows
+        for Order_id `replay` (regardless of their ledger status) when given.
+        """
+        order_ids = df['Order_id'].map(order_key)
+        if replay is not None:
+            return df[order_ids == order_key(replay)]
+        keys = list(zip(order_ids, df['Payment_id'].map(order_key)))
+        done = self.done_keys(order_ids)
+        return df[[key not in done for key in keys]]
+
+    def record(self, df, outcomes):
+        """Store {row index: (status, detail)} outcomes for rows of `df`."""
+        now = datetime.now(timezone.utc).isoformat()
+        self.conn.executemany(
+            """
+            INSERT INTO ledger (kind, order_id, payment_id, status, detail, processed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (kind, order_id, payment_id)
+            DO UPDATE SET status = excluded.status, detail = excluded.detail, processed_at = excluded.processed_at
+            """,
+            [
+                (self.kind, order_key(df.at[index, 'Order_id']), order_key(df.at[index, 'Payment_id']),
+                 status, detail, now)
+                for index, (status, detail) in outcomes.items()
+            ],
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -1,80 +1,137 @@
 from pymongo import MongoClient
-from openpyxl import Workbook
 from dotenv import load_dotenv
+import argparse
 import os
 from datetime import datetime
 
+from sheet_export import SpreadsheetWriter
+
 load_dotenv()
 
 MONGODB_URI = os.getenv("MONGODB_URI")
 DB_NAME = os.getenv("DB_NAME")
 
 
-def export_team_validation_report():
+HEADERS = [
+    "Team Code",
+    "Team Name",
+    "Event Name",
+    "Team Leader Name",
+    "Total Members",
+    "Minimum Required Members",
+    "Maximum Allowed Members",
+    "Payment Status",
+    "Validation Status"
+]
+
+SUMMARY_HEADERS = ["Event Name", "Teams", "Valid", "Incomplete", "Paid"]
+
+# Aggregate: populate event + team leader, projected down to the report's fields
+PIPELINE = [
+    {
+        "$lookup": {
+            "from": "events",
+            "localField": "eventId",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"eventName": 1, "minMembersPerTeam": 1, "maxMembersPerTeam": 1}}],
+            "as": "eventData"
+        }
+    },
+    {"$unwind": "$eventData"},
+    {
+        "$lookup": {
+            "from": "users",
+            "localField": "teamLeader",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"fullName": 1, "name": 1}}],
+            "as": "leaderData"
+        }
+    },
+    {"$unwind": "$leaderData"},
+    {
+        "$project": {
+            "teamCode": 1,
+            "teamName": 1,
+            "paymentStatus": 1,
+            "memberCount": {"$size": {"$ifNull": ["$team", []]}},
+            "eventData": 1,
+            "leaderData": 1
+        }
+    },
+]
+
+
+def teams_from_snapshot():
+    # Same shape as PIPELINE, from the local Parquet snapshot
+    # (scripts/analytics_cache.py); no Mongo access
+    from analytics_cache import load_snapshot
+
+    teams = load_snapshot("teams")
+    events = load_snapshot("events").set_index("_id")
+    users = load_snapshot("users").set_index("_id")
+
+    rows = []
+    # Inner joins, like $unwind: teams without a known event or leader are dropped
+    for team in teams.astype(object).where(teams.notna(), None).to_dict("records"):
+        if team.get("eventId") not in events.index or team.get("teamLeader") not in users.index:
+            continue
+        event = events.loc[team["eventId"]]
+        leader = users.loc[team["teamLeader"]]
+        team["memberCount"] = len(team["team"]) if team.get("team") is not None else 0
+        team["eventData"] = {"_id": team["eventId"], **event[event.notna()].to_dict()}
+        team["leaderData"] = leader[leader.notna()].to_dict()
+        rows.append(team)
+    return rows
+
+
+def export_team_validation_report(from_snapshot=False, fmt="xlsx"):
+    if from_snapshot:
+        teams = teams_from_snapshot()
+        write_report(teams, fmt)
+        return
+
     client = MongoClient(MONGODB_URI)
     db = client[DB_NAME]
 
-    teams_collection = db["teams"]
-
-    # Aggregate: populate event + team leader
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "events",
-                "localField": "eventId",
-                "foreignField": "_id",
-                "as": "eventData"
-            }
-        },
-        {"$unwind": "$eventData"},
-        {
-            "$lookup": {
-                "from": "users",
-                "localField": "teamLeader",
-                "foreignField": "_id",
-                "as": "leaderData"
-            }
-        },
-        {"$unwind": "$leaderData"},
-    ]
-
-    teams = list(teams_collection.aggregate(pipeline))
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Team Validation Report"
-
-    # Headers
-    headers = [
-        "Team Code",
-        "Team Name",
-        "Event Name",
-        "Team Leader Name",
-        "Total Members",
-        "Minimum Required Members",
-        "Maximum Allowed Members",
-        "Payment Status",
-        "Validation Status"
-    ]
-
-    ws.append(headers)
+    # One aggregation for every event; rows are streamed from the cursor into the file
+    teams = db["teams"].aggregate(PIPELINE)
+    write_report(teams, fmt)
+
+    client.close()
+
+
+def write_report(teams, fmt="xlsx"):
+    """
+    Single pass over `teams`: every row goes to the "All Teams" sheet and to its
+    event's sheet; per-event counts are kept for the "Summary" sheet.
+    """
+    filename = f"team_validation_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    out = SpreadsheetWriter(filename)
+
+    # Created first so it is the first tab; filled once all counts are known
+    summary_sheet = out.add_sheet("Summary", SUMMARY_HEADERS)
+    all_sheet = out.add_sheet("All Teams", HEADERS)
+    event_sheets = {}
+    summary = {}
 
     for team in teams:
+        event = team["eventData"]
+        leader = team["leaderData"]
+
         team_code = team.get("teamCode", "")
         team_name = team.get("teamName", "")
-        event_name = team["eventData"].get("eventName", "")
-        leader_name = team["leaderData"].get("name", "Unknown")
+        event_name = event.get("eventName", "")
+        leader_name = leader.get("fullName") or leader.get("name") or "Unknown"
 
-        members = team.get("team", [])
-        current_count = len(members)
+        current_count = team.get("memberCount", 0)
 
-        min_required = team["eventData"].get("minMembersPerTeam", 1)
-        max_allowed = team["eventData"].get("maxMembersPerTeam", "")
+        min_required = event.get("minMembersPerTeam", 1)
+        max_allowed = event.get("maxMembersPerTeam", "")
         payment_status = team.get("paymentStatus", "N/A")
 
         status = "VALID" if current_count >= min_required else "INCOMPLETE"
 
-        ws.append([
+        row = [
             team_code,
             team_name,
             event_name,
@@ -84,24 +141,40 @@ def export_team_validation_report():
             max_allowed,
             payment_status,
             status
+        ]
+        all_sheet.append(row)
+
+        event_id = event["_id"]
+        if event_id not in event_sheets:
+            event_sheets[event_id] = out.add_sheet(event_name or str(event_id), HEADERS)
+            summary[event_id] = {"name": event_name, "teams": 0, "valid": 0, "paid": 0}
+        event_sheets[event_id].append(row)
+
+        counts = summary[event_id]
+        counts["teams"] += 1
+        counts["valid"] += status == "VALID"
+        counts["paid"] += payment_status == "completed"
+
+    for counts in sorted(summary.values(), key=lambda c: (c["name"] or "").lower()):
+        summary_sheet.append([
+            counts["name"],
+            counts["teams"],
+            counts["valid"],
+            counts["teams"] - counts["valid"],
+            counts["paid"]
         ])
 
-    # Auto adjust column width
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
-        ws.column_dimensions[column_letter].width = max_length + 2
-
-    filename = f"team_validation_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    wb.save(filename)
+    # Column widths are sized while writing
+    out.close()
 
-    client.close()
-
-    print(f"\n✅ Report exported successfully: {filename}")
+    print(f"\n✅ Report exported successfully: {filename} ({len(summary)} event sheet(s))")
 
 
 if __name__ == "__main__":
-    export_team_validation_report()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Export the team validation report")
+    parser.add_argument("--from-snapshot", action="store_true",
+                        help="Read the local snapshot (scripts/analytics_cache.py) instead of Mongo")
+    parser.add_argument("--format", choices=["xlsx", "csv"], default="xlsx", help="Output format (default: xlsx)")
+    args = parser.parse_args()
+
+    export_team_validation_report(from_snapshot=args.from_snapshot, fmt=args.format)
\ No newline at end of file
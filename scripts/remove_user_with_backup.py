@@ -1,19 +1,25 @@
 #!/usr/bin/env python3
 """
-Surgically remove a user and all affiliated data from the database.
-Creates a local JSON backup before deletion. Supports restore.
+Surgically remove one or more users and all affiliated data from the database.
+Creates a local backup before deletion in the content-addressed store under
+scripts/backups (see backup_store.py): each unique document is kept once, with exact
+BSON types, and backups are found through an index by user and time. Supports
+restore, including the older .json / .json.gz backup files.
 
 Usage:
   python scripts/remove_user_with_backup.py <user_id|fullName>     # Delete (with backup)
   python scripts/remove_user_with_backup.py <user_id|fullName> --dry-run   # Preview only
-  python scripts/remove_user_with_backup.py --restore <backup.json>       # Restore from backup
+  python scripts/remove_user_with_backup.py <id> <id> ... | --file spam.txt [--transaction]  # Several users at once
+  python scripts/remove_user_with_backup.py --list [user_id|fullName]     # Backups from the index
+  python scripts/remove_user_with_backup.py --restore <backup_id|file>    # Restore from backup
 """
 
 import argparse
+import gzip
 import json
 import os
 import sys
-from datetime import datetime, timezone
+from datetime import datetime
 from pathlib import Path
 
 root = Path(__file__).resolve().parent.parent
@@ -25,10 +31,14 @@ load_dotenv(root / "client" / ".env.local")
 load_dotenv(root / ".env.local")
 load_dotenv(root / ".env")
 
-from pymongo import MongoClient
-from bson import ObjectId
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+from bson import ObjectId, json_util
 
-BACKUPS_DIR = Path(__file__).resolve().parent / "backups"
+from backup_store import BackupStore
+from user_index import EXACT, UserIndex, is_object_id, print_candidates
+
+DUPLICATE_KEY_ERROR = 11000
 
 
 def get_db(client):
@@ -47,21 +57,8 @@ def get_db(client):
     return None
 
 
-def serialize(d):
-    """Convert doc for JSON (ObjectId/datetime -> str)."""
-    if isinstance(d, dict):
-        return {k: serialize(v) for k, v in d.items()}
-    if isinstance(d, list):
-        return [serialize(x) for x in d]
-    if isinstance(d, ObjectId):
-        return str(d)
-    if isinstance(d, datetime):
-        return d.isoformat()
-    return d
-
-
 def deserialize(d):
-    """Convert JSON backup back for MongoDB insert (_id, datetime)."""
+    """Convert a legacy JSON backup back for MongoDB insert (_id, datetime)."""
     if isinstance(d, dict):
         out = {}
         for k, v in d.items():
@@ -83,148 +80,221 @@ def deserialize(d):
     return d
 
 
-def fetch_full_context(db, oid):
-    """Fetch user + all related docs. Returns raw docs for backup."""
-    user = db["users"].find_one({"_id": oid})
-    if not user:
+_seminar_collections = {}
+
+
+def seminar_collection(db):
+    """Name of the seminar registrations collection (looked up once per database)."""
+    if db.name not in _seminar_collections:
+        names = db.list_collection_names()
+        _seminar_collections[db.name] = "SeminarRegistration" if "SeminarRegistration" in names else "seminarregistrations"
+    return _seminar_collections[db.name]
+
+
+def fetch_full_context(db, oids):
+    """Fetch users + all related docs (one query per collection). Returns raw docs for backup."""
+    oids = list(oids)
+    users = list(db["users"].find({"_id": {"$in": oids}}))
+    if not users:
         return None
 
-    regs = list(db["registrations"].find({"participant": oid}))
-    teams_lead = list(db["teams"].find({"teamLeader": oid}))
-    teams_mem = list(db["teams"].find({"team": oid}))
-    sem_coll = "SeminarRegistration" if "SeminarRegistration" in db.list_collection_names() else "seminarregistrations"
-    sem_regs = list(db[sem_coll].find({"participant": oid}))
+    regs = list(db["registrations"].find({"participant": {"$in": oids}}))
+    teams_lead = list(db["teams"].find({"teamLeader": {"$in": oids}}))
+    teams_mem = list(db["teams"].find({"team": {"$in": oids}}))
+    sem_regs = list(db[seminar_collection(db)].find({"participant": {"$in": oids}}))
 
     # Dedupe teams (leader teams also appear in teams_mem when user is sole member)
     team_ids = {t["_id"] for t in teams_lead}
     for t in teams_mem:
         if t["_id"] not in team_ids:
+            team_ids.add(t["_id"])
             teams_lead.append(t)
 
     return {
-        "user": user,
+        "users": users,
         "registrations": regs,
         "teams": teams_lead,
         "seminar_registrations": sem_regs,
-        "meta": {
-            "backup_at": datetime.now(timezone.utc).isoformat(),
-            "user_id": str(oid),
-            "username": user.get("username"),
-            "fullName": user.get("fullName"),
-            "email": user.get("email"),
-        },
     }
 
 
-def delete_user_data(db, ctx):
-    """Delete in correct order to avoid ref issues."""
-    oid = ctx["user"]["_id"]
-    sem_coll = "SeminarRegistration" if "SeminarRegistration" in db.list_collection_names() else "seminarregistrations"
-
+def delete_user_data(db, ctx, session=None):
+    """
+    Delete everything in `ctx` in correct order to avoid ref issues: one bulk write
+    for the events.registrations pulls (grouped by event), then one delete_many per collection.
+    """
     # events.registrations: solo events store Registration IDs, team events store Team IDs
-    events_updated = 0
-
-    # Solo registrations: pull registration IDs from events
+    pulls = {}
     for r in ctx["registrations"]:
         if not r.get("isInTeam"):
-            result = db["events"].update_one(
-                {"_id": r["eventId"]},
-                {"$pull": {"registrations": r["_id"]}}
-            )
-            if result.modified_count:
-                events_updated += 1
-
-    # Teams being deleted: pull team IDs from events (team events store team IDs in events.registrations)
+            pulls.setdefault(r["eventId"], []).append(r["_id"])
     for t in ctx["teams"]:
-        result = db["events"].update_one(
-            {"_id": t["eventId"]},
-            {"$pull": {"registrations": t["_id"]}}
-        )
-        if result.modified_count:
-            events_updated += 1
+        pulls.setdefault(t["eventId"], []).append(t["_id"])
 
-    # Now delete registrations
-    r = db["registrations"].delete_many({"participant": oid})
-    reg_deleted = r.deleted_count
-
-    # 2. Teams (where user is leader or member)
-    team_ids = [t["_id"] for t in ctx["teams"]]
-    t = db["teams"].delete_many({"_id": {"$in": team_ids}})
-    team_deleted = t.deleted_count
-
-    # 3. Seminar registrations
-    s = db[sem_coll].delete_many({"participant": oid})
-    sem_deleted = s.deleted_count
+    events_updated = 0
+    if pulls:
+        result = db["events"].bulk_write(
+            [UpdateOne({"_id": eid}, {"$pull": {"registrations": {"$in": ids}}}) for eid, ids in pulls.items()],
+            ordered=False,
+            session=session,
+        )
+        events_updated = result.modified_count
 
-    # 4. User
-    u = db["users"].delete_one({"_id": oid})
-    user_deleted = u.deleted_count
+    def delete(coll, docs):
+        if not docs:
+            return 0
+        return db[coll].delete_many({"_id": {"$in": [d["_id"] for d in docs]}}, session=session).deleted_count
 
     return {
-        "registrations": reg_deleted,
+        "registrations": delete("registrations", ctx["registrations"]),
         "events_updated": events_updated,
-        "teams": team_deleted,
-        "seminar_registrations": sem_deleted,
-        "user": user_deleted,
+        "teams": delete("teams", ctx["teams"]),
+        "seminar_registrations": delete(seminar_collection(db), ctx["seminar_registrations"]),
+        "user": delete("users", ctx["users"]),
     }
 
 
-def restore_from_backup(db, backup_path):
-    """Restore documents from backup JSON."""
-    path = Path(backup_path)
-    if not path.is_file():
-        print(f"Backup file not found: {path}", file=sys.stderr)
-        sys.exit(1)
+def delete_in_transaction(client, db, ctx):
+    """delete_user_data() as one transaction (needs a replica set or sharded cluster)."""
+    with client.start_session() as session:
+        return session.with_transaction(lambda s: delete_user_data(db, ctx, session=s))
 
-    with open(path) as f:
-        data = json.load(f)
 
-    meta = data.get("meta", {})
-    print(f"Restoring backup for user: {meta.get('username')} ({meta.get('fullName')})")
+def resolve_users(db, idents):
+    """
+    Users for a list of _ids / usernames / fullNames / emails (one users query).
+    Anything but an _id goes through the local user index and must match exactly one
+    user; no fuzzy deletes. Near misses are printed. Returns (users, not_found).
+    """
+    index = UserIndex()
+    index.refresh(db["users"])
 
-    # Restore order: user first, then registrations, teams, seminar_registrations
-    sem_coll = "SeminarRegistration" if "SeminarRegistration" in db.list_collection_names() else "seminarregistrations"
+    wanted = {}
+    not_found = []
+    for ident in idents:
+        if is_object_id(ident):
+            wanted[ident] = ObjectId(ident)
+            continue
+        candidates = index.search(ident)
+        exact = [c for c in candidates if c["score"] == EXACT]
+        if len(exact) == 1:
+            wanted[ident] = ObjectId(exact[0]["id"])
+            continue
+        not_found.append(ident)
+        if candidates:
+            print(f"{'Ambiguous' if exact else 'No exact match for'} '{ident}', candidates:", file=sys.stderr)
+            print_candidates(candidates[:5])
+    index.close()
+
+    found = {u["_id"]: u for u in db["users"].find({"_id": {"$in": list(set(wanted.values()))}})}
+    users = {}
+    for ident, oid in wanted.items():
+        if oid in found:
+            users.setdefault(oid, found[oid])
+        else:
+            not_found.append(ident)
+    return list(users.values()), not_found
+
+
+def read_idents(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+
+def read_backup(path):
+    """
+    Contents of a backup file from before the backup store: gzip Extended JSON
+    (.json.gz) or indented .json, which goes through deserialize().
+    """
+    if path.name.endswith(".gz"):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json_util.loads(f.read())
+    with open(path) as f:
+        data = json.load(f)
+    return {k: v if k == "meta" else deserialize(v) for k, v in data.items()}
+
+
+def insert_docs(coll, docs):
+    """insert_many(ordered=False) that skips documents that already exist. Returns inserted count."""
+    if not docs:
+        return 0
+    try:
+        return len(coll.insert_many(docs, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        if any(err["code"] != DUPLICATE_KEY_ERROR for err in e.details["writeErrors"]):
+            raise
+        return e.details["nInserted"]
+
+
+def restore_from_backup(db, backup):
+    """
+    Restore a backup (store backup id, or a legacy backup file): one insert_many
+    per collection, one bulk write for events.
+    """
+    path = Path(backup)
+    if path.is_file():
+        data = read_backup(path)
+    else:
+        store = BackupStore()
+        data = store.load(backup)
+        store.close()
+    if data is None:
+        print(f"Backup not found: {backup}", file=sys.stderr)
+        sys.exit(1)
 
-    user = deserialize(data["user"])
-    db["users"].insert_one(user)
-    print(f"  Restored user: {user['_id']}")
+    # Single-user backups store "user", multi-user backups "users"
+    users = data["users"] if "users" in data else [data["user"]]
+    for meta in data.get("meta", {}).get("users") or [data.get("meta", {})]:
+        print(f"Restoring backup for user: {meta.get('username')} ({meta.get('fullName')})")
+
+    # Restore order: users first, then registrations, teams, seminar_registrations
+    counts = {
+        "users": insert_docs(db["users"], users),
+        "registrations": insert_docs(db["registrations"], data["registrations"]),
+        "teams": insert_docs(db["teams"], data["teams"]),
+        "seminar registrations": insert_docs(db[seminar_collection(db)], data["seminar_registrations"]),
+    }
+    for name, n in counts.items():
+        print(f"  Restored {n} {name}")
 
-    # Restore registrations; for solo only, add reg ID to events.registrations
+    # events.registrations: solo registration IDs and team IDs, grouped by event
+    adds = {}
     for r in data["registrations"]:
-        doc = deserialize(r)
-        db["registrations"].insert_one(doc)
-        if not doc.get("isInTeam"):
-            db["events"].update_one(
-                {"_id": doc["eventId"]},
-                {"$addToSet": {"registrations": doc["_id"]}}
-            )
-        print(f"  Restored registration: {doc['_id']}")
-
-    # Restore teams; add team ID to events.registrations (team events store team IDs)
+        if not r.get("isInTeam"):
+            adds.setdefault(r["eventId"], []).append(r["_id"])
     for t in data["teams"]:
-        doc = deserialize(t)
-        db["teams"].insert_one(doc)
-        db["events"].update_one(
-            {"_id": doc["eventId"]},
-            {"$addToSet": {"registrations": doc["_id"]}}
+        adds.setdefault(t["eventId"], []).append(t["_id"])
+    if adds:
+        result = db["events"].bulk_write(
+            [UpdateOne({"_id": eid}, {"$addToSet": {"registrations": {"$each": ids}}}) for eid, ids in adds.items()],
+            ordered=False,
         )
-        print(f"  Restored team: {doc['_id']}")
-
-    for sr in data["seminar_registrations"]:
-        doc = deserialize(sr)
-        db[sem_coll].insert_one(doc)
-        print(f"  Restored seminar registration: {doc['_id']}")
+        print(f"  Re-linked registrations on {result.modified_count} event(s)")
 
     print("Restore complete.")
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Remove user and affiliated data (with backup/restore)")
-    parser.add_argument("ident", nargs="?", help="User _id or fullName")
+    parser = argparse.ArgumentParser(description="Remove users and affiliated data (with backup/restore)")
+    parser.add_argument("idents", nargs="*", metavar="ident", help="User _id, username, fullName or email (several allowed)")
+    parser.add_argument("--file", help="File with one user _id, username, fullName or email per line")
     parser.add_argument("--dry-run", action="store_true", help="Preview only, do not delete")
-    parser.add_argument("--restore", metavar="BACKUP.json", help="Restore from backup file")
+    parser.add_argument("--transaction", action="store_true", help="Run all deletes in one transaction (replica set only)")
+    parser.add_argument("--restore", metavar="BACKUP", help="Restore from a backup id (or legacy backup file)")
+    parser.add_argument("--list", nargs="?", const="", metavar="USER", help="List backups, optionally for one user")
     args = parser.parse_args()
 
+    # --- LIST --- (local index only)
+    if args.list is not None:
+        store = BackupStore()
+        rows = store.find(args.list or None)
+        store.close()
+        for backup_id, user_id, username, full_name, backup_at, dry_run in rows:
+            print(f"{backup_id}  {backup_at}  {user_id}  {username} ({full_name}){'  [dry run]' if dry_run else ''}")
+        if not rows:
+            print("No backups found")
+        return
+
     uri = os.getenv("MONGODB_URI")
     if not uri:
         print("MONGODB_URI not set in env", file=sys.stderr)
@@ -242,73 +312,55 @@ def main():
         return
 
     # --- DELETE ---
-    if not args.ident:
-        parser.error("ident required (user _id or fullName)")
-
-    ident = args.ident
-    oid = None
-    if len(ident) == 24 and all(c in "0123456789abcdef" for c in ident.lower()):
-        try:
-            oid = ObjectId(ident)
-        except Exception:
-            pass
-
-    if oid:
-        user = db["users"].find_one({"_id": oid})
-    else:
-        user = db["users"].find_one({"fullName": ident})
-        if user:
-            oid = user["_id"]
+    idents = list(args.idents) + (read_idents(args.file) if args.file else [])
+    if not idents:
+        parser.error("ident or --file required (user _id, username, fullName or email)")
 
-    if not user:
+    users, not_found = resolve_users(db, idents)
+    for ident in not_found:
         print(f"User not found: {ident}", file=sys.stderr)
+    if not users:
         sys.exit(1)
 
-    ctx = fetch_full_context(db, oid)
+    ctx = fetch_full_context(db, [u["_id"] for u in users])
     if not ctx:
         print("Could not fetch user context", file=sys.stderr)
         sys.exit(1)
 
-    # Serialize for backup
-    backup_data = {
-        "user": serialize(dict(ctx["user"])),
-        "registrations": [serialize(dict(r)) for r in ctx["registrations"]],
-        "teams": [serialize(dict(t)) for t in ctx["teams"]],
-        "seminar_registrations": [serialize(dict(sr)) for sr in ctx["seminar_registrations"]],
-        "meta": {
-            "backup_at": datetime.now(timezone.utc).isoformat(),
-            "user_id": str(oid),
-            "username": user.get("username"),
-            "fullName": user.get("fullName"),
-            "email": user.get("email"),
-        },
-    }
-
-    # Save backup
-    BACKUPS_DIR.mkdir(parents=True, exist_ok=True)
-    ts = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    username_safe = (user.get("username") or "user").replace("/", "-")[:30]
-    backup_path = BACKUPS_DIR / f"user_backup_{username_safe}_{ts}.json"
-    with open(backup_path, "w") as f:
-        json.dump(backup_data, f, indent=2, default=str)
-    print(f"Backup saved to: {backup_path}")
+    # Backup (each unique document is stored once, with its exact BSON types)
+    user_meta = [
+        {
+            "user_id": str(u["_id"]),
+            "username": u.get("username"),
+            "fullName": u.get("fullName"),
+            "email": u.get("email"),
+        }
+        for u in ctx["users"]
+    ]
+    store = BackupStore()
+    backup_id = store.save(ctx, user_meta, dry_run=args.dry_run)
+    store.close()
+    print(f"Backup saved: {backup_id}")
 
     if args.dry_run:
         print("\n[DRY RUN] Would delete:")
-        print(f"  - 1 user: {user.get('username')} ({user.get('fullName')})")
+        print(f"  - {len(ctx['users'])} user(s): " + ", ".join(f"{u.get('username')} ({u.get('fullName')})" for u in ctx["users"]))
         print(f"  - {len(ctx['registrations'])} registration(s)")
         print(f"  - {len(ctx['teams'])} team(s)")
         print(f"  - {len(ctx['seminar_registrations'])} seminar registration(s)")
         print(f"\nTo actually delete, run without --dry-run")
-        print(f"To restore: python scripts/remove_user_with_backup.py --restore {backup_path}")
+        print(f"To restore: python scripts/remove_user_with_backup.py --restore {backup_id}")
         return
 
     # Delete
-    counts = delete_user_data(db, ctx)
-    print(f"\nDeleted: {counts['user']} user, {counts['registrations']} registrations, "
+    if args.transaction:
+        counts = delete_in_transaction(client, db, ctx)
+    else:
+        counts = delete_user_data(db, ctx)
+    print(f"\nDeleted: {counts['user']} user(s), {counts['registrations']} registrations, "
           f"{counts['teams']} teams, {counts['seminar_registrations']} seminar registrations")
     print(f"Updated {counts['events_updated']} event(s) (removed registration IDs from events.registrations)")
-    print(f"\nTo restore: python scripts/remove_user_with_backup.py --restore {backup_path}")
+    print(f"\nTo restore: python scripts/remove_user_with_backup.py --restore {backup_id}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+"""
+Streaming spreadsheet writer shared by external.py and regi.py.
+
+Rows go straight into openpyxl's write-only workbook (or the csv module), so memory
+stays flat however many rows a cursor yields. Write-only sheets need their column
+widths before the first row is written, so each sheet holds back its first
+WIDTH_SAMPLE_ROWS rows, sizes the columns from them and the header while they arrive,
+then streams everything else. No second pass over the cells.
+
+For a .csv path every sheet is its own file: the first sheet is written to the path
+itself, later ones to <stem>_<sheet title>.csv next to it.
+"""
+
+import csv
+import re
+from pathlib import Path
+
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+WIDTH_SAMPLE_ROWS = 500
+MAX_WIDTH = 80
+INVALID_TITLE_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def cell_width(value):
+    return len(str(value)) if value not in (None, "") else 0
+
+
+class XlsxSheet:
+    def __init__(self, ws, headers):
+        self.ws = ws
+        self.widths = [cell_width(h) for h in headers]
+        self.pending = [list(headers)]
+        self.rows = 0
+
+    def append(self, row):
+        row = list(row)
+        self.rows += 1
+        if self.pending is None:
+            self.ws.append(row)
+            return
+        for i, value in enumerate(row):
+            if i < len(self.widths):
+                self.widths[i] = max(self.widths[i], cell_width(value))
+            else:
+                self.widths.append(cell_width(value))
+        self.pending.append(row)
+        if len(self.pending) > WIDTH_SAMPLE_ROWS:
+            self.flush()
+
+    def flush(self):
+        """Fix the column widths and write the held-back rows."""
+        if self.pending is None:
+            return
+        for i, width in enumerate(self.widths, 1):
+            self.ws.column_dimensions[get_column_letter(i)].width = min(width + 2, MAX_WIDTH)
+        for row in self.pending:
+            self.ws.append(row)
+        self.pending = None
+
+
+class CsvSheet:
+    def __init__(self, path, headers):
+        self.path = path
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(headers)
+        self.rows = 0
+
+    def append(self, row):
+        self.writer.writerow(["" if v is None else v for v in row])
+        self.rows += 1
+
+    def flush(self):
+        self.file.close()
+
+
+class SpreadsheetWriter:
+    """
+    Write-only .xlsx or .csv output (chosen by the path's extension).
+
+        with SpreadsheetWriter("report.xlsx") as out:
+            sheet = out.add_sheet("Teams", ["Code", "Name"])
+            for doc in cursor:
+                sheet.append([doc["code"], doc["name"]])
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.is_csv = self.path.suffix.lower() == ".csv"
+        self.wb = None if self.is_csv else Workbook(write_only=True)
+        self.sheets = {}
+
+    def sheet_title(self, title):
+        # Excel: max 31 chars, no []:*?/\ and unique (case-insensitively)
+        base = INVALID_TITLE_CHARS.sub("_", str(title)).strip() or "Sheet"
+        base = base[:31]
+        taken = {t.lower() for t in self.sheets}
+        candidate, n = base, 2
+        while candidate.lower() in taken:
+            suffix = f" ({n})"
+            candidate, n = base[:31 - len(suffix)] + suffix, n + 1
+        return candidate
+
+    def csv_path(self, title):
+        # Unique by final file name: distinct titles like "Robo-War" and "Robo War" both
+        # become <stem>_Robo_War, and the second file must not overwrite the first
+        if not self.sheets:
+            return self.path
+        taken = {sheet.path.name.lower() for sheet in self.sheets.values()}
+        base = f"{self.path.stem}_{re.sub(r'[^A-Za-z0-9]+', '_', title).strip('_')}"
+        candidate, n = f"{base}.csv", 2
+        while candidate.lower() in taken:
+            candidate, n = f"{base}_{n}.csv", n + 1
+        return self.path.with_name(candidate)
+
+    def add_sheet(self, title, headers):
+        title = self.sheet_title(title)
+        if self.is_csv:
+            sheet = CsvSheet(self.csv_path(title), headers)
+        else:
+            sheet = XlsxSheet(self.wb.create_sheet(title), headers)
+        self.sheets[title] = sheet
+        return sheet
+
+    def close(self):
+        for sheet in self.sheets.values():
+            sheet.flush()
+        if self.wb is not None:
+            if not self.sheets:
+                self.wb.create_sheet("Sheet")
+            self.wb.save(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_rows(path, headers, rows, title="Sheet1"):
+    """Stream an iterable of rows into a single-sheet file. Returns the row count."""
+    with SpreadsheetWriter(path) as out:
+        sheet = out.add_sheet(title, headers)
+        for row in rows:
+            sheet.append(row)
+    return sheet.rows
@@ -103,7 +103,10 @@ def main():
         print(f"[DRY RUN] Would {action} registration (set isActive={target_state})")
         return
 
-    result = events.update_one({"_id": event["_id"]}, {"$set": {"isActive": target_state}})
+    result = events.update_one(
+        {"_id": event["_id"], "isActive": {"$ne": target_state}},
+        {"$set": {"isActive": target_state}, "$currentDate": {"updatedAt": True}},
+    )
     if result.modified_count:
         new_status = "OPEN" if target_state else "CLOSED"
         print(f"Registration {action.replace('turn ', '').replace('toggle to ', '')} ({new_status})")
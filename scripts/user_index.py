@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Local search index over users (username, fullName, email, phone) for fast fuzzy lookups.
+Used by add_user_to_team.py, fetch_user_full_context.py and remove_user_with_backup.py
+instead of unanchored regex scans of the users collection.
+
+  scripts/user_index.sqlite3
+    users  one row per user with normalized (lowercased) fields, B-tree indexed for
+           exact and prefix matches
+    grams  trigram postings (gram -> user id) for substring / typo-tolerant matches
+
+Ranking: exact match on any field (100) > prefix match (80) > trigram overlap (up to 70).
+The index refreshes incrementally (users created or updated since the last refresh, plus
+deletes via an _id-only read) when older than REFRESH_TTL, or when a search finds nothing.
+Every hit is re-read from Mongo by _id before use, so a stale entry never returns a
+deleted user.
+
+Usage:
+  python scripts/user_index.py <query>      # Ranked candidates
+  python scripts/user_index.py --refresh    # Incremental refresh now
+  python scripts/user_index.py --rebuild    # Rebuild from scratch
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+
+from dotenv import load_dotenv
+
+load_dotenv(root / "client" / ".env.local")
+load_dotenv(root / ".env.local")
+load_dotenv(root / ".env")
+
+from pymongo import MongoClient
+from bson import ObjectId
+
+INDEX_FILE = Path(__file__).resolve().parent / "user_index.sqlite3"
+REFRESH_TTL = timedelta(minutes=10)
+OVERLAP = timedelta(minutes=2)  # re-read window for writes in flight at the last refresh
+
+EXACT = 100
+PREFIX = 80
+FUZZY_MAX = 70
+FUZZY_MIN_OVERLAP = 0.5  # share of the query's trigrams a candidate must contain
+ACCEPT = 45  # lowest score resolve_user() returns without exact_only (~70% of the query's trigrams)
+
+PROJECTION = {"username": 1, "fullName": 1, "email": 1, "phoneNumber": 1}
+SPACES = re.compile(r"\s+")
+NON_DIGITS = re.compile(r"\D")
+
+
+def get_db(client):
+    db_name = os.getenv("DB_NAME")
+    if db_name:
+        return client[db_name]
+    dbs = [d for d in client.list_database_names() if d not in ("admin", "config", "local")]
+    for name in dbs:
+        if "users" not in client[name].list_collection_names():
+            continue
+        if client[name]["users"].find_one({"fullName": {"$exists": True}}):
+            return client[name]
+    for name in dbs:
+        if "users" in client[name].list_collection_names():
+            return client[name]
+    return None
+
+
+def normalize(value):
+    return SPACES.sub(" ", str(value or "")).strip().lower()
+
+
+def normalize_phone(value):
+    # Last 10 digits, so "+91 98765-43210" and "9876543210" compare equal
+    return NON_DIGITS.sub("", str(value or ""))[-10:]
+
+
+def trigrams(text):
+    text = f" {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def is_object_id(ident):
+    return len(ident) == 24 and all(c in "0123456789abcdef" for c in ident.lower())
+
+
+class UserIndex:
+    def __init__(self, path=INDEX_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id TEXT PRIMARY KEY,
+                username TEXT,
+                full_name TEXT,
+                email TEXT,
+                phone TEXT,
+                gram_count INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS users_username ON users (username);
+            CREATE INDEX IF NOT EXISTS users_full_name ON users (full_name);
+            CREATE INDEX IF NOT EXISTS users_email ON users (email);
+            CREATE INDEX IF NOT EXISTS users_phone ON users (phone);
+            CREATE TABLE IF NOT EXISTS grams (
+                gram TEXT NOT NULL,
+                id TEXT NOT NULL,
+                PRIMARY KEY (gram, id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+
+    # --- maintenance ---
+
+    def get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def forget(self, ids):
+        ids = [(str(i),) for i in ids]
+        self.conn.executemany("DELETE FROM grams WHERE id = ?", ids)
+        self.conn.executemany("DELETE FROM users WHERE id = ?", ids)
+
+    def add(self, docs):
+        count = 0
+        for doc in docs:
+            uid = str(doc["_id"])
+            fields = [normalize(doc.get("username")), normalize(doc.get("fullName")), normalize(doc.get("email"))]
+            grams = set().union(*(trigrams(f) for f in fields if f))
+            self.forget([uid])
+            self.conn.execute(
+                "INSERT INTO users VALUES (?, ?, ?, ?, ?, ?)",
+                (uid, *fields, normalize_phone(doc.get("phoneNumber")), len(grams)),
+            )
+            self.conn.executemany("INSERT INTO grams VALUES (?, ?)", [(g, uid) for g in grams])
+            count += 1
+        return count
+
+    def refresh(self, users, full=False):
+        """Bring the index up to date with the users collection. Returns (changed, deleted)."""
+        started = datetime.now(timezone.utc)
+        watermark = self.get_meta("watermark")
+
+        if full or not watermark:
+            self.conn.execute("DELETE FROM grams")
+            self.conn.execute("DELETE FROM users")
+            changed = self.add(users.find({}, PROJECTION))
+            deleted = 0
+        else:
+            since = datetime.fromisoformat(watermark) - OVERLAP
+            changed = self.add(users.find({"$or": [
+                {"_id": {"$gte": ObjectId.from_datetime(since)}},
+                {"updatedAt": {"$gte": since}},
+            ]}, PROJECTION))
+            live = {str(d["_id"]) for d in users.find({}, {"_id": 1})}
+            gone = [uid for (uid,) in self.conn.execute("SELECT id FROM users") if uid not in live]
+            self.forget(gone)
+            deleted = len(gone)
+
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('watermark', ?)", (started.isoformat(),))
+        self.conn.commit()
+        return changed, deleted
+
+    def ensure_fresh(self, users, ttl=REFRESH_TTL):
+        watermark = self.get_meta("watermark")
+        if not watermark or datetime.now(timezone.utc) - datetime.fromisoformat(watermark) > ttl:
+            self.refresh(users)
+
+    # --- lookups ---
+
+    def search(self, query, limit=10):
+        """Ranked candidates: [{"id", "score", "username", "fullName", "email", "phone"}]."""
+        q = normalize(query)
+        if not q:
+            return []
+        phone = normalize_phone(q) if len(NON_DIGITS.sub("", q)) >= 6 else ""
+        scores = {}
+
+        def hit(ids, score):
+            for (uid,) in ids:
+                scores[uid] = max(scores.get(uid, 0), score)
+
+        hit(self.conn.execute(
+            "SELECT id FROM users WHERE username = ?1 OR full_name = ?1 OR email = ?1 OR (?2 != '' AND phone = ?2)",
+            (q, phone),
+        ), EXACT)
+
+        # Email-like queries only match exactly (so "kumar@x" never picks some other Kumar)
+        if "@" not in q:
+            upper = q + "\U0010ffff"
+            for column in ("username", "full_name", "email"):
+                hit(self.conn.execute(f"SELECT id FROM users WHERE {column} >= ? AND {column} < ?", (q, upper)), PREFIX)
+            if phone:
+                hit(self.conn.execute("SELECT id FROM users WHERE phone >= ? AND phone < ?", (phone, phone + "\U0010ffff")), PREFIX)
+
+            # Fuzzy hits cannot outrank a full page of exact/prefix hits
+            grams = trigrams(q)
+            if len(q) >= 3 and len(scores) < limit:
+                placeholders = ", ".join("?" * len(grams))
+                for uid, shared, gram_count in self.conn.execute(
+                    f"SELECT g.id, COUNT(*), u.gram_count FROM grams g JOIN users u ON u.id = g.id "
+                    f"WHERE g.gram IN ({placeholders}) GROUP BY g.id",
+                    tuple(grams),
+                ):
+                    overlap = shared / len(grams)
+                    if overlap >= FUZZY_MIN_OVERLAP:
+                        # Query coverage; candidate coverage breaks ties toward closer matches
+                        score = FUZZY_MAX * (0.9 * overlap + 0.1 * shared / max(gram_count, 1))
+                        scores[uid] = max(scores.get(uid, 0), round(score, 1))
+
+        if not scores:
+            return []
+        ranked = sorted(scores.items(), key=lambda kv: -kv[1])[:limit]
+        rows = {
+            r[0]: r
+            for r in self.conn.execute(
+                f"SELECT id, username, full_name, email, phone FROM users WHERE id IN ({', '.join('?' * len(ranked))})",
+                [uid for uid, _ in ranked],
+            )
+        }
+        return [
+            {"id": uid, "score": score, "username": rows[uid][1], "fullName": rows[uid][2],
+             "email": rows[uid][3], "phone": rows[uid][4]}
+            for uid, score in ranked
+        ]
+
+    def close(self):
+        self.conn.close()
+
+
+def resolve_user(db, ident, exact_only=False, index=None):
+    """
+    (user doc, ranked candidates) for a user _id, username, fullName, email or phone.
+    The user is the only live candidate with the best score, which must be at least
+    ACCEPT (EXACT with `exact_only`), re-read from Mongo. None when there is no such
+    candidate or several share the best score ("rahu" -> rahul and rahuls).
+    """
+    ident = ident.strip()
+    if is_object_id(ident):
+        return db["users"].find_one({"_id": ObjectId(ident)}), []
+
+    own_index = index is None
+    index = index or UserIndex()
+    try:
+        index.ensure_fresh(db["users"])
+        candidates = index.search(ident)
+        if not candidates:
+            # Possibly a user created since the last refresh
+            index.refresh(db["users"])
+            candidates = index.search(ident)
+
+        remaining = [c for c in candidates if c["score"] >= (EXACT if exact_only else ACCEPT)]
+        while remaining:
+            best = [c for c in remaining if c["score"] == remaining[0]["score"]]
+            users = list(db["users"].find({"_id": {"$in": [ObjectId(c["id"]) for c in best]}}))
+            if users:
+                return (users[0] if len(users) == 1 else None), candidates
+            # All deleted since the last refresh; fall back to the next score
+            index.forget([c["id"] for c in best])
+            index.conn.commit()
+            remaining = remaining[len(best):]
+        return None, candidates
+    finally:
+        if own_index:
+            index.close()
+
+
+def print_candidates(candidates, file=sys.stderr):
+    for c in candidates:
+        print(f"  {c['score']:>5}  {c['id']}  {c['username']} | {c['fullName']} | {c['email']}", file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fuzzy user search index")
+    parser.add_argument("query", nargs="?", help="Username, fullName, email or phone (partial ok)")
+    parser.add_argument("--refresh", action="store_true", help="Incremental refresh now")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index from scratch")
+    parser.add_argument("--limit", type=int, default=10, help="Candidates to show (default: 10)")
+    args = parser.parse_args()
+
+    uri = os.getenv("MONGODB_URI")
+    if not uri:
+        print("MONGODB_URI not set in env", file=sys.stderr)
+        sys.exit(1)
+
+    client = MongoClient(uri)
+    db = get_db(client)
+    if db is None:
+        print("No suitable database found", file=sys.stderr)
+        sys.exit(1)
+
+    index = UserIndex()
+    if args.rebuild or args.refresh:
+        changed, deleted = index.refresh(db["users"], full=args.rebuild)
+        print(f"Indexed {changed} user(s), removed {deleted}")
+    else:
+        index.ensure_fresh(db["users"])
+
+    if args.query:
+        candidates = index.search(args.query, limit=args.limit)
+        if candidates:
+            print_candidates(candidates, file=sys.stdout)
+        else:
+            print("No matches")
+    index.close()
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
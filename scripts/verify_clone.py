@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Verify that a clone/migration target matches the source (MONGODB_URI).
+
+Each collection is split into _id ranges. Every range is hashed on both sides in parallel:
+an order-independent digest (count + sum of per-document BLAKE2b hashes of the raw BSON).
+Only ranges whose digests differ are split further and re-hashed, down to small leaf ranges
+where per-document hashes are compared to name the exact missing/extra/changed _ids.
+When the two sides match, each side is read once.
+
+Usage:
+  python scripts/verify_clone.py                               # Compare against CLONE_URI (db_clone.py)
+  python scripts/verify_clone.py --target-env TARGET_URI       # Compare against TARGET_URI (CTF_migration.py)
+  python scripts/verify_clone.py --collection registrations --query '{"eventId": {"$oid": "..."}}'
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo import MongoClient
+from bson import json_util
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from dotenv import load_dotenv
+load_dotenv()
+
+SOURCE_URI = os.getenv("MONGODB_URI")
+DB_NAME = os.getenv("DB_NAME")
+
+RANGES = 16  # top-level _id ranges per collection
+FANOUT = 8  # sub-ranges per mismatching range
+LEAF_DOCS = 2000  # ranges this small are diffed document by document
+SHOW_IDS = 20  # differing _ids printed per category
+
+DIGEST_MASK = (1 << 128) - 1
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+def doc_hash(doc):
+    return hashlib.blake2b(doc.raw, digest_size=16).digest()
+
+
+def range_filter(base, lo, hi):
+    """`base` restricted to [lo, hi) on _id (None = unbounded)."""
+    bounds = {}
+    if lo is not None:
+        bounds["$gte"] = lo
+    if hi is not None:
+        bounds["$lt"] = hi
+    if not bounds:
+        return base
+    if not base:
+        return {"_id": bounds}
+    return {"$and": [base, {"_id": bounds}]}
+
+
+def split(collection, base, lo, hi, parts):
+    """Split [lo, hi) into up to `parts` sub-ranges of roughly equal size (by source documents)."""
+    buckets = list(collection.aggregate(
+        [{"$match": range_filter(base, lo, hi)}, {"$bucketAuto": {"groupBy": "$_id", "buckets": parts}}],
+        allowDiskUse=True,
+    ))
+    bounds = [b["_id"]["min"] for b in buckets[1:]]
+    return list(zip([lo] + bounds, bounds + [hi]))
+
+
+def digest(collection, query):
+    """Order-independent (count, digest) of the documents matching `query`."""
+    count = 0
+    total = 0
+    for doc in collection.find(query):
+        count += 1
+        total = (total + int.from_bytes(doc_hash(doc), "little")) & DIGEST_MASK
+    return count, total
+
+
+def doc_hashes(collection, query):
+    return {doc["_id"]: doc_hash(doc) for doc in collection.find(query)}
+
+
+def diff_leaf(source, target, query, report):
+    src = doc_hashes(source, query)
+    dst = doc_hashes(target, query)
+    for _id, h in src.items():
+        if _id not in dst:
+            report["missing"].append(_id)
+        elif dst[_id] != h:
+            report["changed"].append(_id)
+    report["extra"].extend(_id for _id in dst if _id not in src)
+
+
+def narrow(pool, source, target, base, lo, hi, src_digest, dst_digest, report):
+    """Recursively split a mismatching range until the differing documents are found."""
+    if max(src_digest[0], dst_digest[0]) <= LEAF_DOCS:
+        diff_leaf(source, target, range_filter(base, lo, hi), report)
+        return
+
+    ranges = split(source, base, lo, hi, FANOUT)
+    if len(ranges) < 2:
+        # Source side is (almost) empty here, so it cannot guide the split
+        diff_leaf(source, target, range_filter(base, lo, hi), report)
+        return
+
+    digests = compare_ranges(pool, source, target, base, ranges)
+    for (sub_lo, sub_hi), (s, d) in zip(ranges, digests):
+        if s != d:
+            narrow(pool, source, target, base, sub_lo, sub_hi, s, d, report)
+
+
+def compare_ranges(pool, source, target, base, ranges):
+    """Digest every range on both sides in parallel; returns [(source digest, target digest)]."""
+    futures = [
+        (pool.submit(digest, source, range_filter(base, lo, hi)),
+         pool.submit(digest, target, range_filter(base, lo, hi)))
+        for lo, hi in ranges
+    ]
+    return [(s.result(), d.result()) for s, d in futures]
+
+
+def verify_collection(pool, source, target, base):
+    count = source.estimated_document_count()
+    ranges = split(source, base, None, None, RANGES) if count > LEAF_DOCS else [(None, None)]
+    report = {"missing": [], "extra": [], "changed": [], "docs": 0}
+
+    for (lo, hi), (s, d) in zip(ranges, compare_ranges(pool, source, target, base, ranges)):
+        report["docs"] += s[0]
+        if s != d:
+            narrow(pool, source, target, base, lo, hi, s, d, report)
+    return report
+
+
+def print_report(name, report):
+    problems = len(report["missing"]) + len(report["extra"]) + len(report["changed"])
+    if not problems:
+        print(f"[OK] {name}: {report['docs']} docs match")
+        return True
+
+    print(f"[MISMATCH] {name}: {len(report['missing'])} missing in target, "
+          f"{len(report['extra'])} extra in target, {len(report['changed'])} differing")
+    for kind in ("missing", "extra", "changed"):
+        ids = report[kind]
+        if ids:
+            shown = ", ".join(str(_id) for _id in ids[:SHOW_IDS])
+            more = f" (+{len(ids) - SHOW_IDS} more)" if len(ids) > SHOW_IDS else ""
+            print(f"  {kind}: {shown}{more}")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify a cloned/migrated DB against the source")
+    parser.add_argument("--target-env", default="CLONE_URI",
+                        help="Env var holding the target URI (default: CLONE_URI)")
+    parser.add_argument("--collection", action="append", help="Only verify this collection (repeatable)")
+    parser.add_argument("--query", help="Extended JSON filter applied on both sides")
+    parser.add_argument("--workers", type=int, default=8, help="Parallel digest workers (default: 8)")
+    args = parser.parse_args()
+
+    target_uri = os.getenv(args.target_env)
+    if not SOURCE_URI or not target_uri or not DB_NAME:
+        print(f"MONGODB_URI, {args.target_env} and DB_NAME must be set in env", file=sys.stderr)
+        sys.exit(1)
+
+    base = json_util.loads(args.query) if args.query else {}
+
+    source_client = MongoClient(SOURCE_URI, maxPoolSize=max(args.workers, 10))
+    target_client = MongoClient(target_uri, maxPoolSize=max(args.workers, 10))
+    source_db = source_client.get_database(DB_NAME, codec_options=RAW_CODEC_OPTIONS)
+    target_db = target_client.get_database(DB_NAME, codec_options=RAW_CODEC_OPTIONS)
+
+    ok = True
+    try:
+        source_names = set(source_db.list_collection_names())
+        target_names = set(target_db.list_collection_names())
+        names = sorted(args.collection or source_names)
+
+        if not args.collection:
+            for name in sorted(target_names - source_names):
+                print(f"[EXTRA] {name}: exists only in target")
+                ok = False
+
+        with ThreadPoolExecutor(max_workers=max(2, args.workers)) as pool:
+            for name in names:
+                if name.startswith("system."):
+                    continue
+                if name not in target_names:
+                    print(f"[MISSING] {name}: not in target")
+                    ok = False
+                    continue
+                report = verify_collection(pool, source_db[name], target_db[name], base)
+                ok = print_report(name, report) and ok
+    finally:
+        source_client.close()
+        target_client.close()
+
+    print("\n✅ Target matches source." if ok else "\n❌ Target differs from source.")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()